@@ -1,14 +1,41 @@
 # app.py - Hugging Face Ready with .env
 
 import os
+import re
+import sys
+import gc
+import html
 import json
+import time
+import bisect
+import asyncio
+import contextvars
+import zlib
+import uuid
+import sqlite3
+import hashlib
+import threading
+import multiprocessing
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import gradio as gr
+from fastapi.responses import PlainTextResponse
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage
 import datetime
 from dotenv import load_dotenv
 
+# Optional: Arrow snapshots make startup fast, but the JSON path works without them
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
 # -----------------------------
 # LOAD ENVIRONMENT VARIABLES
 # -----------------------------
@@ -23,6 +50,70 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 APP_TITLE = "JobYaari Career Assistant 🤖"
 DATA_PATH = "jobyaari_full_dataset.json"
 
+# Binary (Arrow/Feather) copy of DATA_PATH, reused while it is newer than the JSON
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.splitext(DATA_PATH)[0] + ".feather")
+
+# Number of candidate jobs sent to Gemini per query
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "20"))
+
+# Cache of parsed Gemini answers (entries, seconds to live)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+
+# Async Gemini calls: hard deadline (s), max in-flight calls, and optional
+# hedge budget (s) after which local results are served while Gemini finishes
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "15"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+# Chat requests allowed to wait for a Gemini slot; past that, new ones get local results only
+LLM_QUEUE_LIMIT = int(os.getenv("LLM_QUEUE_LIMIT", "4"))
+
+# Gemini prompt budget in estimated tokens; the lowest-ranked candidates are
+# left out until the prompt fits
+LLM_PROMPT_TOKENS = int(os.getenv("LLM_PROMPT_TOKENS", "2000"))
+# Extra Gemini calls when a reply cannot be parsed (errors and timeouts are never retried)
+LLM_PARSE_RETRIES = int(os.getenv("LLM_PARSE_RETRIES", "1"))
+# Request application/json output; needs a model with JSON mode (gemini-1.5 and later)
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "0") == "1"
+
+# Chat turns kept verbatim per session; older turns are folded into a summary line
+MAX_CHAT_TURNS = int(os.getenv("MAX_CHAT_TURNS", "20"))
+
+# Chat sessions: backend ("memory" or "sqlite"), max sessions kept in memory,
+# idle seconds before a session expires, and the SQLite file
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "86400"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+# Rendered chat turns reused across messages; stores keep only the turns' text
+TURN_CACHE_SIZE = int(os.getenv("TURN_CACHE_SIZE", "5000"))
+
+# Job cards shown per results page
+JOB_PAGE_SIZE = int(os.getenv("JOB_PAGE_SIZE", "20"))
+
+# Offline semantic search: vectors file, hash buckets, results per query and
+# the minimum cosine similarity for a job to count as a match
+VECTORS_PATH = os.getenv("VECTORS_PATH", os.path.splitext(DATA_PATH)[0] + ".vectors.npz")
+SEMANTIC_DIM = 2 ** 18
+SEMANTIC_TOP_K = int(os.getenv("SEMANTIC_TOP_K", "20"))
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.15"))
+
+# Hide jobs whose last date has passed (set to 0 to keep showing them)
+HIDE_EXPIRED_JOBS = os.getenv("HIDE_EXPIRED_JOBS", "1") != "0"
+
+# Per-request span trace (JSONL); empty disables tracing
+TRACE_PATH = os.getenv("TRACE_PATH", "")
+
+# Seconds between checks of DATA_PATH for changes (0 disables hot reload)
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", "5"))
+
+# Serving: local-search worker processes (1 searches in the server process),
+# chat requests handled at once, and requests allowed to queue before new ones are turned away
+WORKERS = int(os.getenv("WORKERS", "1"))
+QUEUE_CONCURRENCY = int(os.getenv("QUEUE_CONCURRENCY", "16"))
+QUEUE_MAX_SIZE = int(os.getenv("QUEUE_MAX_SIZE", "64"))
+SERVER_PORT = int(os.getenv("SERVER_PORT", "7860"))
+
 # Initialize Gemini LLM only if API key is available
 llm = None
 if GEMINI_API_KEY:
@@ -39,14 +130,174 @@ if GEMINI_API_KEY:
 else:
     print("❌ GEMINI_API_KEY not found in environment variables")
 
+# -----------------------------
+# METRICS & TRACING
+# -----------------------------
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _labels(pairs):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}" if pairs else ""
+
+
+class Metrics:
+    """Counters and per-span latency histograms, rendered in the Prometheus text format"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.counters = {}  # (name, label pairs) -> count
+        self.histograms = {}  # span -> [bucket counts (last one is +Inf), sum of seconds]
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, span_name, seconds):
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self.histograms.get(span_name)
+            if histogram is None:
+                histogram = self.histograms[span_name] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][bucket] += 1
+            histogram[1] += seconds
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((name, list(counts), total) for name, (counts, total) in self.histograms.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        if histograms:
+            lines.append("# TYPE jobyaari_span_seconds histogram")
+        for name, counts, total in histograms:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"jobyaari_span_seconds_bucket{_labels([('span', name), ('le', bound)])} {cumulative}")
+            lines.append(f"jobyaari_span_seconds_sum{_labels([('span', name)])} {total:.6f}")
+            lines.append(f"jobyaari_span_seconds_count{_labels([('span', name)])} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+# Span list of the request being traced in this context (None when tracing is off)
+_current_trace = contextvars.ContextVar("trace", default=None)
+_trace_lock = threading.Lock()
+
+
+def record_span(name, seconds):
+    """Add one timing to the span histogram, and to the request trace when tracing"""
+    metrics.observe(name, seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append([name, round(seconds * 1000, 3)])
+
+
+class span:
+    """Context manager timing a block with record_span (a class: cheaper than @contextmanager)"""
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        record_span(self.name, time.perf_counter() - self.start)
+
+
+class RequestTrace:
+    """Spans of one request, appended to TRACE_PATH as a JSON line when it finishes"""
+
+    def __init__(self, query, path=TRACE_PATH):
+        self.path = path
+        self.start = time.perf_counter()
+        self.record = {"ts": round(time.time(), 3), "query": query, "spans": []}
+        self.activate()
+
+    def activate(self):
+        """Make this the trace spans record into (again, after an async generator resumes)"""
+        _current_trace.set(self.record["spans"])
+
+    def finish(self, **fields):
+        _current_trace.set(None)
+        self.record.update(fields, total_ms=round((time.perf_counter() - self.start) * 1000, 3))
+        line = json.dumps(self.record, ensure_ascii=False, default=str)
+        try:
+            with _trace_lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write trace to {self.path}: {e}")
+
+
+def start_trace(query):
+    """A RequestTrace when TRACE_PATH is set, otherwise None"""
+    return RequestTrace(query) if TRACE_PATH else None
+
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-def load_data():
-    with open(DATA_PATH, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    df = pd.DataFrame(data)
-    print(f"✅ Loaded {len(df)} jobs")
+# Low-cardinality text columns, stored dictionary-encoded
+CATEGORICAL_COLUMNS = ['Category', 'Organization', 'Location', 'Experience', 'Qualification',
+                       'Last Date', 'Posted Date']
+
+# DD-MM-YYYY text columns and the datetime columns parsed from them; the text
+# is kept for display since it also holds values like "Check Notification"
+DATE_COLUMNS = {'Last Date': 'Last Date Parsed', 'Posted Date': 'Posted Date Parsed'}
+
+
+def compact_jobs(data):
+    """Categorical dtypes for repetitive columns plus parsed date columns"""
+    for column in CATEGORICAL_COLUMNS:
+        if column in data:
+            data[column] = data[column].astype('category')
+    for column, parsed in DATE_COLUMNS.items():
+        if column in data:
+            data[parsed] = pd.to_datetime(data[column].astype(object), format="%d-%m-%Y", errors="coerce")
+    return data
+
+
+def snapshot_is_fresh(path=DATA_PATH, snapshot_path=SNAPSHOT_PATH):
+    return os.path.exists(snapshot_path) and os.path.getmtime(snapshot_path) >= os.path.getmtime(path)
+
+
+def write_snapshot(data, snapshot_path=SNAPSHOT_PATH):
+    """Best effort: a read-only deployment simply keeps loading the JSON"""
+    if feather is None:
+        return
+    try:
+        feather.write_feather(data, snapshot_path)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"⚠️ Could not write snapshot {snapshot_path}: {e}")
+
+
+def load_data(path=DATA_PATH, snapshot_path=SNAPSHOT_PATH):
+    """The jobs frame, from a fresh Arrow snapshot when there is one; never writes files"""
+    start = time.perf_counter()
+    if feather is not None and snapshot_is_fresh(path, snapshot_path):
+        df = feather.read_table(snapshot_path, memory_map=True).to_pandas()
+        source = "snapshot"
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        df = compact_jobs(pd.DataFrame(data))
+        source = "JSON"
+    print(f"✅ Loaded {len(df)} jobs from {source} in {time.perf_counter() - start:.2f}s")
     return df
 
 df = load_data()
@@ -54,75 +305,112 @@ df = load_data()
 # -----------------------------
 # IMPROVED RESPONSE FORMATTER
 # -----------------------------
-def format_job_cards(results_df):
-    """Convert dataframe to beautiful job cards with apply buttons"""
-    if results_df.empty:
-        return "<div style='text-align: center; color: #64748b; padding: 20px;'>No jobs found 😔</div>"
-    
-    cards_html = "<div style='display: flex; flex-direction: column; gap: 15px;'>"
-    
-    for _, job in results_df.iterrows():
-        cards_html += f"""
-        <div style="background: linear-gradient(135deg, #1e3a5f, #2d4a7c); border-radius: 15px; padding: 20px; border: 1px solid #2563eb; color: white;">
-            <div style="display: flex; justify-content: space-between; align-items: start;">
-                <div style="flex: 1;">
-                    <h3 style="margin: 0 0 8px 0; color: #fbbf24;">{job['Title']}</h3>
-                    <p style="margin: 5px 0; font-size: 14px; color: #cbd5e1;">🏢 {job['Organization']}</p>
-                    <p style="margin: 5px 0; font-size: 14px; color: #cbd5e1;">📍 {job['Location']}</p>
-                    <p style="margin: 5px 0; font-size: 14px; color: #cbd5e1;">💰 {job['Salary']}</p>
-                    <p style="margin: 5px 0; font-size: 14px; color: #cbd5e1;">🎓 {job['Qualification']}</p>
-                    <p style="margin: 5px 0; font-size: 14px; color: #cbd5e1;">⏰ Experience: {job['Experience']}</p>
-                    <p style="margin: 5px 0; font-size: 14px; color: #fca5a5;">📅 Last Date: {job['Last Date']}</p>
+def format_job_card(job):
+    """HTML for a single job card, styled by the shared .job-card classes"""
+    return f"""
+        <div class="job-card">
+            <div class="job-card-body">
+                <div class="job-card-info">
+                    <h3 class="job-card-title">{job['Title']}</h3>
+                    <p class="job-card-line">🏢 {job['Organization']}</p>
+                    <p class="job-card-line">📍 {job['Location']}</p>
+                    <p class="job-card-line">💰 {job['Salary']}</p>
+                    <p class="job-card-line">🎓 {job['Qualification']}</p>
+                    <p class="job-card-line">⏰ Experience: {job['Experience']}</p>
+                    <p class="job-card-line job-card-deadline">📅 Last Date: {job['Last Date']}</p>
                 </div>
-                <button style="background: linear-gradient(45deg, #f97316, #fb923c); border: none; border-radius: 10px; color: white; padding: 10px 20px; font-weight: bold; cursor: pointer; white-space: nowrap;">
-                    Apply Now 🚀
-                </button>
+                <button class="apply-btn">Apply Now 🚀</button>
             </div>
         </div>
         """
+
+
+def format_job_cards(results_df, page=0, page_size=None, snap=None):
+    """Convert one page of the dataframe to beautiful job cards with apply buttons"""
+    if results_df.empty:
+        return "<div style='text-align: center; color: #64748b; padding: 20px;'>No jobs found 😔</div>"
+    
+    page_size = JOB_PAGE_SIZE if page_size is None else page_size
+    total = len(results_df)
+    pages = (total + page_size - 1) // page_size
+    page = min(max(page, 0), pages - 1)
+    start = page * page_size
+    page_df = results_df.iloc[start:start + page_size]
     
-    cards_html += "</div>"
-    return cards_html
+    # Rendered cards are cached per job id on the dataset version they came from
+    card_cache = (snap or snapshot).job_card_cache
+    cards = []
+    with span("cards"):
+        for job_id, job in zip(page_df.index, page_df.to_dict('records')):
+            card = card_cache.get(job_id)
+            if card is None:
+                card = card_cache[job_id] = format_job_card(job)
+            cards.append(card)
+    
+    header = f"<div class='job-page-info'>Showing {start + 1}–{start + len(page_df)} of {total} jobs • Page {page + 1} of {pages}</div>"
+    return header + "<div class='job-cards-list'>" + "".join(cards) + "</div>"
+
+def count_response(spec, snap=None):
+    """Exact numbers for "how many" questions, straight from the facet counts"""
+    facets = (snap or snapshot).facets
+    count = facets.count(spec)
+    where = "open right now" if HIDE_EXPIRED_JOBS else "in our database"
+    has_filters = spec.categories or spec.locations or spec.experience or spec.degrees
+    if not has_filters:
+        text = f"📊 Woah! We've got {count} amazing opportunities {where}! That's like a buffet of career options 🍽️!"
+    elif count == 0:
+        return f"📊 There are 0 {describe_spec(spec)} {where} - but new ones pop up all the time, so check back soon! 🔔"
+    else:
+        text = f"📊 There are exactly {count} {describe_spec(spec)} {where}! 🎯"
+    # Split by category, or by location once the category is fixed
+    split = facets.breakdown(spec, 'Location' if spec.categories else 'Category')
+    details = " • ".join(f"{value}: {n}" for value, n in list(split.items())[:5])
+    if details:
+        text += f"\n\n{details}"
+    return text
 
-def create_funny_response(user_query, results_count, results_df):
+
+def create_funny_response(user_query, results_count, results_df, spec=None, snap=None):
     """Create engaging, humorous responses based on query and results"""
-    query_lower = user_query.lower()
+    spec = spec or parse_query(user_query, snap)
+    intent = spec.intent
+    
+    # "How many ..." questions get exact counts whatever else they mention
+    if spec.total and spec.closing is None:
+        return count_response(spec, snap), results_df
     
     # Handle specific question types with fun responses
-    if any(word in query_lower for word in ["hello", "hi", "hey", "namaste"]):
+    if intent == "greeting":
         return f"👋 Hey there! Welcome to JobYaari! I found {results_count} awesome jobs waiting for you! What department are you exploring today? 😄", results_df
     
-    elif any(word in query_lower for word in ["faq", "frequently asked", "help"]):
+    elif intent == "faq":
         return "📖 Our FAQ section is at www.jobyaari.com/faq - but honestly, I'm way more fun to talk to! 😉 What can I help you find? Engineering gigs? Science opportunities? Tell me! 🎯", results_df
     
-    elif any(word in query_lower for word in ["engineering", "engineer"]):
+    elif intent == "engineering":
         if results_count > 0:
             return f"🔧 Engineering whiz, huh? Fantastic! I found {results_count} engineering positions that might make your resume do a happy dance! 💃 What specific field in engineering interests you?", results_df
         else:
             return "🔧 Engineering is awesome! While I don't have specific engineering roles right now, check back soon - new opportunities pop up faster than bugs in production code! 🐛😄", results_df
     
-    elif any(word in query_lower for word in ["science", "scientist"]):
+    elif intent == "science":
         if results_count > 0:
             return f"🔬 Science enthusiast! Excellent! I found {results_count} science positions that are more exciting than a chemical reaction! 🧪 What specific area of science interests you?", results_df
         else:
             return "🔬 Science is amazing! While I don't have specific science roles right now, new discoveries (and jobs!) happen every day! 🔍 Check back soon!", results_df
     
-    elif any(word in query_lower for word in ["get job", "will i get", "find job"]):
+    elif intent == "get_job":
         return f"🎯 Will you get a job? With that awesome attitude - ABSOLUTELY! 🚀 I found {results_count} opportunities for you. The right job is like WiFi - sometimes you just need to move around a bit to find the best connection! 📶 Keep applying! ", results_df
     
-    elif any(word in query_lower for word in ["total", "count", "how many"]):
-        return f"📊 Woah! We've got {results_count} amazing opportunities in our database! That's like a buffet of career options 🍽️! What flavor are you craving today? 😄", results_df
-    
-    elif any(word in query_lower for word in ["thank", "thanks"]):
+    elif intent == "thanks":
         return "🤗 You're welcome! Remember, I'm here 24/7 to help you find your dream job! Now go apply to those positions before someone else snacks on your opportunity! 🍩🚀", results_df
     
-    elif any(word in query_lower for word in ["bye", "goodbye", "see you"]):
+    elif intent == "bye":
         return "👋 Bye bye! Don't be a stranger! Come back anytime you need job hunting support. Remember: Your next job is probably refreshing its browser waiting for YOU! 💻😄", results_df
     
-    elif "experience" in query_lower and results_count > 0:
+    elif intent == "experience" and results_count > 0:
         return f"⏰ Got it! Looking for specific experience levels! I found {results_count} jobs matching your experience criteria! 🎯 Want to filter by location or qualification too?", results_df
     
-    elif "qualification" in query_lower and results_count > 0:
+    elif intent == "qualification" and results_count > 0:
         return f"🎓 Education matters! I found {results_count} jobs with qualifications that might match your background! 📚 Should we look at specific categories?", results_df
     
     # Default responses based on result count
@@ -135,167 +423,1959 @@ def create_funny_response(user_query, results_count, results_df):
     else:
         return f"🎊 WOW! Found {results_count} amazing jobs for you! Someone's got options! 😎 What specific field should we focus on?", results_df
 
+# -----------------------------
+# QUERY PARSER
+# -----------------------------
+# Hand-written aliases layered on top of the vocabulary read from the dataset.
+# Values are case-insensitive regexes over the Location / Qualification columns.
+# Cities also match their state, since many listings only name the state.
+LOCATION_ALIASES = {
+    "delhi": "Delhi",
+    "new delhi": "Delhi",
+    "bangalore": "Bangalore|Bengaluru|Karnataka",
+    "bengaluru": "Bangalore|Bengaluru|Karnataka",
+    "mumbai": "Mumbai|Bombay|Maharashtra",
+    "bombay": "Mumbai|Bombay|Maharashtra",
+    "chennai": "Chennai|Madras|Tamil Nadu",
+    "madras": "Chennai|Madras|Tamil Nadu",
+    "hyderabad": "Hyderabad|Telangana",
+    "kolkata": "Kolkata|Calcutta|West Bengal",
+    "calcutta": "Kolkata|Calcutta|West Bengal",
+    "pune": "Pune|Maharashtra",
+    "orissa": "Odisha|Orissa",
+    "gurgaon": "Gurgaon|Gurugram|Haryana",
+    "gurugram": "Gurgaon|Gurugram|Haryana",
+}
+
+# Degree phrase -> literal terms, each matched as a whole word (see degree_pattern)
+DEGREE_ALIASES = {
+    "b.tech": ["B.Tech", "B.E", "Engineering", "BE", "BTech"],
+    "btech": ["B.Tech", "B.E", "Engineering", "BE", "BTech"],
+    "b.e": ["B.Tech", "B.E", "Engineering", "BE", "BTech"],
+    "b.sc": ["B.Sc", "Science", "BSC"],
+    "bsc": ["B.Sc", "Science", "BSC"],
+    "b.com": ["B.Com", "Commerce", "BCOM"],
+    "bcom": ["B.Com", "Commerce", "BCOM"],
+    "m.tech": ["M.Tech", "M.E", "ME", "MTech"],
+    "mtech": ["M.Tech", "M.E", "ME", "MTech"],
+    "m.e": ["M.Tech", "M.E", "ME", "MTech"],
+    "m.sc": ["M.Sc", "MSC"],
+    "msc": ["M.Sc", "MSC"],
+    "mba": ["MBA"],
+    "phd": ["PhD", "Ph.D"],
+    "ph.d": ["PhD", "Ph.D"],
+}
+
+FRESHER_PHRASES = ["fresher", "no experience", "entry level"]
+RECENCY_PHRASES = ["latest", "recent", "new", "notification", "notifications"]
+# Deadline phrases -> days from today the last date may fall within
+CLOSING_PHRASES = {
+    "closing today": 0,
+    "last date today": 0,
+    "closing tomorrow": 1,
+    "closing soon": 7,
+    "ending soon": 7,
+    "closing this week": 7,
+    "deadline this week": 7,
+    "last date this week": 7,
+    "closing this month": 30,
+    "deadline this month": 30,
+}
+TOTAL_PHRASES = ["total", "count", "how many"]
+
+# Response intents in priority order: the first one found in a query wins
+INTENT_RULES = [
+    ("greeting", ["hello", "hi", "hey", "namaste"]),
+    ("faq", ["faq", "frequently asked", "help"]),
+    ("engineering", ["engineering", "engineer"]),
+    ("science", ["science", "scientist"]),
+    ("get_job", ["get job", "will i get", "find job"]),
+    ("count", TOTAL_PHRASES),
+    ("thanks", ["thank", "thanks"]),
+    ("bye", ["bye", "goodbye", "see you"]),
+    ("experience", ["experience", "experienced", "no experience"]),
+    ("qualification", ["qualification"]),
+]
+
+NUMBER_WORDS = {"zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+# "2 years", "3+ yrs", "at least two years", "up to 5 years" ... but not "25 years old"
+YEARS_PATTERN = (r"(?P<bound>at least |atleast |minimum |min |more than |over |above |"
+                 r"up to |upto |less than |under |below |maximum |max )?"
+                 r"(?P<years>\d+|" + "|".join(NUMBER_WORDS) + r")\s*(?P<plus>\+)?\s*(?:years?|yrs?)"
+                 r"(?!\s*(?:old|of age|age))")
+# A plain "N years" is only an experience filter when the query also talks about experience
+EXPERIENCE_CONTEXT = re.compile(r"(?<![a-z0-9])(?:experience|experienced|exp|yoe)(?![a-z0-9])")
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """Typed filters and intent extracted from one user query"""
+    categories: tuple = ()
+    locations: tuple = ()  # regexes over Location, OR-ed together
+    experience: tuple = None  # (min_years, max_years or None) the job may require
+    degrees: tuple = ()  # regexes over Qualification, OR-ed together
+    latest: bool = False
+    total: bool = False
+    closing: int = None  # last date within this many days of today
+    intent: str = None
+
+    def to_dict(self):
+        return {
+            "categories": list(self.categories),
+            "locations": list(self.locations),
+            "experience": list(self.experience) if self.experience else None,
+            "degrees": list(self.degrees),
+            "latest": self.latest,
+            "total": self.total,
+            "closing": self.closing,
+            "intent": self.intent,
+        }
+
+
+def _years_range(match, text):
+    """Experience range for a matched YEARS_PATTERN, or None when nothing says it is experience
+
+    "3+ years" and "at least 3 years" read as experience on their own; a bare
+    "3 years" needs EXPERIENCE_CONTEXT somewhere in text (e.g. "jobs for 3 year olds" is not).
+    """
+    years = match.group("years")
+    years = NUMBER_WORDS[years] if years in NUMBER_WORDS else int(years)
+    bound = (match.group("bound") or "").strip()
+    if match.group("plus") or bound in ("at least", "atleast", "minimum", "min", "more than", "over", "above"):
+        return (years, None)
+    if bound:
+        return (0, years)
+    if EXPERIENCE_CONTEXT.search(text) is None:
+        return None
+    return (years, years)
+
+
+# Query words never tried as misspelt places or degrees
+FUZZY_STOPWORDS = {"job", "jobs", "in", "for", "with", "and", "or", "the", "at", "of", "near", "show",
+                   "me", "any", "all", "find", "want", "need", "around", "from", "to", "a", "an"}
+# Longest run of query words joined into one fuzzy term ("andra pradesh", "b tech")
+FUZZY_MAX_WORDS = 3
+# Remembered lookups per vocabulary; query words repeat, so most lookups are one dict hit
+FUZZY_CACHE_SIZE = 20000
+
+
+def compact_term(text):
+    """Letters and digits only: 'B. Tech' and 'b-tech' both become 'btech'"""
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def edit_budget(term):
+    """Typos tolerated in a term of this length; short words must match exactly"""
+    return 0 if len(term) <= 4 else 1 if len(term) <= 8 else 2
+
+
+def _deletes(term, edits):
+    """term with up to `edits` characters removed, in every way"""
+    found = {term}
+    frontier = {term}
+    for _ in range(edits):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a, b, limit):
+    """Optimal-string-alignment distance (adjacent swaps cost 1), or limit + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+class FuzzyVocabulary:
+    """Typo- and spacing-tolerant lookup of vocabulary phrases (SymSpell-style delete dictionary)
+
+    Each phrase is stored under its compact form and every form with up to
+    edit_budget() characters deleted. A query term is looked up the same way,
+    so a lookup is a handful of dict probes however large the vocabulary is.
+    """
+
+    def __init__(self, phrases):
+        self.terms = {}  # compact form -> phrase
+        self.deletes = {}  # compact form minus some characters -> compact forms
+        self.cache = {}  # query term -> phrase or None
+        for phrase in phrases:
+            term = compact_term(phrase)
+            if len(term) < 2 or term in self.terms:
+                continue
+            self.terms[term] = phrase
+            for deleted in _deletes(term, edit_budget(term)):
+                self.deletes.setdefault(deleted, set()).add(term)
+        self.longest = max(map(len, self.terms), default=0)
+
+    def lookup(self, text):
+        """Closest phrase within the edit budget, or None (also when two phrases tie)"""
+        term = compact_term(text)
+        if term in self.cache:
+            return self.cache[term]
+        if len(self.cache) >= FUZZY_CACHE_SIZE:
+            self.cache.clear()
+        phrase = self.cache[term] = self._closest(term)
+        return phrase
+
+    def _closest(self, term):
+        if term in self.terms:
+            return self.terms[term]
+        budget = edit_budget(term)
+        if not budget or len(term) > self.longest + budget:
+            return None
+        best, best_distance, tied = None, budget + 1, False
+        for deleted in _deletes(term, budget):
+            for candidate in self.deletes.get(deleted, ()):
+                if candidate == best:
+                    continue
+                distance = edit_distance(term, candidate, min(budget, edit_budget(candidate)))
+                if distance < best_distance:
+                    best, best_distance, tied = candidate, distance, False
+                elif distance == best_distance:
+                    tied = True
+        if best is None or tied or best_distance > min(budget, edit_budget(best)):
+            return None
+        return self.terms[best]
+
+
+# Around a dataset term so "ca" matches "CA" but not the "ca" inside "Education"
+WORD_START = r"(?<![a-z0-9])"
+WORD_END = r"(?![a-z0-9])"
+
+
+def whole_word(term):
+    """Case-insensitive pattern matching term only where it is not part of a longer word"""
+    return WORD_START + re.escape(term) + WORD_END
+
+
+def degree_pattern(terms):
+    """Pattern matching any of the literal terms as a whole word, e.g. B.Tech but not B.Ed"""
+    return "|".join(whole_word(term) for term in terms)
+
+
+def _qualification_terms(values):
+    """Distinct degree names in the dataset, e.g. 'B.E/B.Tech' -> b.e, b.tech"""
+    terms = set()
+    for value in values:
+        for part in str(value).split('/'):
+            part = part.strip().lower()
+            if part:
+                terms.add(part)
+    return terms
+
+
+class QueryParser:
+    """Turns query text into a QuerySpec with one compiled-regex pass
+
+    The vocabulary is the dataset's own Category, Location and Qualification
+    values plus the alias tables above, so new places and degrees in the data
+    become searchable without code changes.
+    """
+
+    def __init__(self, data):
+        # phrase -> [(kind, value), ...]; the first registration of a phrase wins per kind
+        self.vocabulary = {}
+
+        for value in data['Category'].dropna().unique():
+            self._add(str(value).lower(), "category", str(value))
+
+        for phrase, pattern in LOCATION_ALIASES.items():
+            self._add(phrase, "location", pattern)
+        for value in data['Location'].dropna().unique():
+            self._add(str(value).lower(), "location", re.escape(str(value)))
+
+        for phrase, terms in DEGREE_ALIASES.items():
+            self._add(phrase, "degree", degree_pattern(terms))
+        for term in _qualification_terms(data['Qualification'].dropna().unique()):
+            self._add(term, "degree", whole_word(term))
+
+        for phrase in FRESHER_PHRASES:
+            self._add(phrase, "experience", (0, 0))
+        self._add("experience", "experience", None)
+        self._add("experienced", "experience", None)
+        for phrase in RECENCY_PHRASES:
+            self._add(phrase, "latest", True)
+        for phrase in TOTAL_PHRASES:
+            self._add(phrase, "total", True)
+        for phrase, days in CLOSING_PHRASES.items():
+            self._add(phrase, "closing", days)
+        for intent, phrases in INTENT_RULES:
+            for phrase in phrases:
+                self._add(phrase, "intent", intent)
+
+        # Longest phrases first so "new delhi" beats "new" and "b.ed" beats "b.e"
+        phrases = sorted(self.vocabulary, key=len, reverse=True)
+        alternation = "|".join(re.escape(phrase) for phrase in phrases)
+        self.pattern = re.compile(
+            rf"(?<![a-z0-9])(?:{YEARS_PATTERN}|(?P<phrase>{alternation})s?)(?![a-z0-9])")
+        self.intent_rank = {intent: rank for rank, (intent, _) in enumerate(INTENT_RULES)}
+        # Places and degrees again, for words the exact pass missed ("banglore", "b tech")
+        self.fuzzy = FuzzyVocabulary(phrase for phrase, entries in self.vocabulary.items()
+                                     if any(kind in ("location", "degree") for kind, _ in entries))
+
+    def _add(self, phrase, kind, value):
+        entries = self.vocabulary.setdefault(phrase, [])
+        if all(existing_kind != kind for existing_kind, _ in entries):
+            entries.append((kind, value))
+
+    @property
+    def location_patterns(self):
+        return {value for entries in self.vocabulary.values() for kind, value in entries if kind == "location"}
+
+    @property
+    def degree_patterns(self):
+        return {value for entries in self.vocabulary.values() for kind, value in entries if kind == "degree"}
+
+    def fuzzy_phrases(self, text, matched):
+        """Vocabulary phrases for runs of words outside the exact matches, longest run first"""
+        words = [word for word in re.finditer(r"[a-z0-9]+", text)
+                 if word.group() not in FUZZY_STOPWORDS and not any(start <= word.start() < end for start, end in matched)]
+        phrases = []
+        i = 0
+        while i < len(words):
+            for size in range(min(FUZZY_MAX_WORDS, len(words) - i), 0, -1):
+                run = words[i:i + size]
+                # Only adjacent words form a run ("andra pradesh", not "andra ... pradesh")
+                if any(re.search(r"[a-z0-9]", text[a.end():b.start()]) for a, b in zip(run, run[1:])):
+                    continue
+                term = "".join(word.group() for word in run)
+                # A lone short word must be spelt out ("be" is not "b.e")
+                phrase = self.fuzzy.lookup(term) if size > 1 or len(term) > 4 else None
+                if phrase is not None:
+                    phrases.append(phrase)
+                    i += size
+                    break
+            else:
+                i += 1
+        return phrases
+
+    def parse(self, user_query):
+        categories, locations, degrees, intents = [], [], [], []
+        experience = None
+        any_experience = latest = total = False
+        closing = None
+
+        text = user_query.lower()
+        matches = list(self.pattern.finditer(text))
+        phrases = [match.group("phrase") for match in matches if match.group("years") is None]
+        phrases += self.fuzzy_phrases(text, [match.span() for match in matches])
+
+        for match in matches:
+            if match.group("years") is not None:
+                experience = experience or _years_range(match, text)
+        for phrase in phrases:
+            for kind, value in self.vocabulary[phrase]:
+                if kind == "category" and value not in categories:
+                    categories.append(value)
+                elif kind == "location" and value not in locations:
+                    locations.append(value)
+                elif kind == "degree" and value not in degrees:
+                    degrees.append(value)
+                elif kind == "experience":
+                    if value is None:
+                        any_experience = True
+                    else:
+                        experience = experience or value
+                elif kind == "latest":
+                    latest = True
+                elif kind == "total":
+                    total = True
+                elif kind == "closing":
+                    closing = value if closing is None else min(closing, value)
+                elif kind == "intent":
+                    intents.append(value)
+
+        # "experience" on its own means any job that asks for some experience
+        if experience is None and any_experience:
+            experience = (1, None)
+
+        return QuerySpec(
+            categories=tuple(categories),
+            locations=tuple(locations),
+            experience=experience,
+            degrees=tuple(degrees),
+            latest=latest,
+            total=total,
+            closing=closing,
+            intent=min(intents, key=self.intent_rank.get) if intents else None,
+        )
+
+
+def parse_query(user_query, snap=None):
+    """QuerySpec for a query, using the current dataset's vocabulary"""
+    return (snap or snapshot).parser.parse(user_query)
+
+# -----------------------------
+# SEARCH INDEX
+# -----------------------------
+LATEST_LIMIT = 15
+
+
+def _pattern_mask(column, pattern):
+    """Case-insensitive regex match evaluated once per distinct column value"""
+    codes, uniques = pd.factorize(column)
+    matched = pd.Series(uniques, dtype=object).str.contains(pattern, case=False, na=False).to_numpy(dtype=bool)
+    # factorize marks missing values with -1; append a False slot for them
+    return np.append(matched, False)[codes]
+
+
+def required_years(experience):
+    """Years of experience a job asks for: Fresher -> 0, 'N+ Years' -> N, unknown -> NaN"""
+    codes, uniques = pd.factorize(experience)
+    years = []
+    for value in uniques:
+        text = str(value).lower()
+        match = re.search(r"(\d+)\s*\+?\s*(?:years?|yrs?)", text)
+        if match:
+            years.append(float(match.group(1)))
+        elif "fresher" in text or "no experience" in text:
+            years.append(0.0)
+        else:
+            years.append(np.nan)
+    return np.append(np.array(years, dtype=float), np.nan)[codes]
+
+
+def experience_mask(years, low, high):
+    """Jobs whose required years fall in [low, high] (high None: low or more)"""
+    mask = years >= low
+    if high is not None:
+        mask &= years <= high
+    elif low <= 1:
+        # "Experience Yes" and similar: some experience, amount unknown
+        mask |= np.isnan(years)
+    return mask
+
+
+# Deadlines like "Walk-in" or "Check Notification" never expire; unknown posting dates sort oldest
+NO_DEADLINE = 2 ** 62
+NO_POSTED_DATE = -2 ** 62
+
+
+def day_number(value=None):
+    """Days since 1970-01-01 of a date (today when None)"""
+    return int(np.datetime64(value or datetime.date.today(), 'D').astype(np.int64))
+
+
+def _day_numbers(data, column, missing):
+    """Parsed date column as day numbers, with missing for unparsed values"""
+    if column not in data:
+        return np.full(len(data), missing, dtype=np.int64)
+    days = data[column].to_numpy(dtype='datetime64[D]')
+    numbers = days.astype(np.int64)
+    numbers[np.isnat(days)] = missing
+    return numbers
+
+
+class DateIndex:
+    """Last and posted dates as day numbers, each sorted once per dataset
+
+    Date questions become binary searches: the jobs still open on a day are a
+    suffix of the deadline order, "closing within N days" is a slice of it,
+    and posting windows are slices of the posted order.
+    """
+
+    def __init__(self, data):
+        self.size = len(data)
+        self.deadline = _day_numbers(data, 'Last Date Parsed', NO_DEADLINE)
+        self.posted = _day_numbers(data, 'Posted Date Parsed', NO_POSTED_DATE)
+        self.by_deadline = np.argsort(self.deadline, kind="stable")
+        self.sorted_deadline = self.deadline[self.by_deadline]
+        self.sorted_posted = np.sort(self.posted)
+        self.by_recency = np.argsort(-self.posted, kind="stable")  # newest first, ties in row order
+        self.recency_rank = np.empty(self.size, dtype=np.int64)
+        self.recency_rank[self.by_recency] = np.arange(self.size)
+        self._open = (None, None, None, None)  # (day, mask, positions, positions newest first)
+
+    def open_rows(self, today):
+        """(mask, positions, positions newest first) of jobs whose last date is today or later
+
+        Computed once per day and reused by every request until the date changes.
+        """
+        day, mask, positions, newest = self._open
+        if day != today:
+            start = np.searchsorted(self.sorted_deadline, today, side="left")
+            mask = np.zeros(self.size, dtype=bool)
+            mask[self.by_deadline[start:]] = True
+            positions = np.flatnonzero(mask)
+            newest = self.by_recency[mask[self.by_recency]]
+            self._open = (today, mask, positions, newest)
+        return mask, positions, newest
+
+    def closing_within(self, today, days):
+        """Row positions with a last date between today and today + days, soonest first"""
+        start = np.searchsorted(self.sorted_deadline, today, side="left")
+        end = np.searchsorted(self.sorted_deadline, today + days, side="right")
+        return self.by_deadline[start:end]
+
+    def newest_first(self, positions):
+        return positions[np.argsort(self.recency_rank[positions], kind="stable")]
+
+    def window_counts(self, today, days=7):
+        """Open, expired, closing-within-days and posted-in-the-last-days job counts"""
+        expired = int(np.searchsorted(self.sorted_deadline, today, side="left"))
+        closing_end = int(np.searchsorted(self.sorted_deadline, today + days, side="right"))
+        posted_start = int(np.searchsorted(self.sorted_posted, today - days, side="left"))
+        posted_end = int(np.searchsorted(self.sorted_posted, today, side="right"))
+        return {
+            "open": self.size - expired,
+            "expired": expired,
+            "closing": closing_end - expired,
+            "posted": posted_end - posted_start,
+        }
+
+
+class SearchIndex:
+    """Boolean postings (one bitmap per vocabulary value) built once per dataset"""
+
+    def __init__(self, data, parser):
+        self.size = len(data)
+        self.dates = DateIndex(data)
+        self.category = {value: (data['Category'] == value).to_numpy(dtype=bool)
+                         for value in data['Category'].dropna().unique()}
+        self.location = {pattern: _pattern_mask(data['Location'], pattern) for pattern in parser.location_patterns}
+        self.degree = {pattern: _pattern_mask(data['Qualification'], pattern) for pattern in parser.degree_patterns}
+        self.years = required_years(data['Experience'])
+
+    def _any(self, postings, keys):
+        """OR of the bitmaps for keys"""
+        mask = np.zeros(self.size, dtype=bool)
+        for key in keys:
+            mask |= postings[key]
+        return mask
+
+    def _filter_mask(self, spec):
+        """AND of the category/location/experience/degree bitmaps, or None when the spec has no filters"""
+        masks = []
+        if spec.categories:
+            masks.append(self._any(self.category, spec.categories))
+        if spec.locations:
+            masks.append(self._any(self.location, spec.locations))
+        if spec.experience is not None:
+            masks.append(experience_mask(self.years, *spec.experience))
+        if spec.degrees:
+            masks.append(self._any(self.degree, spec.degrees))
+
+        if not masks:
+            return None
+
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = mask & other
+        return mask
+
+    def lookup(self, spec, today=None, hide_expired=None):
+        """Return row positions matching the spec, or None for every row
+
+        "Latest" queries come back newest first and "closing" queries soonest
+        deadline first; expired jobs are left out unless hide_expired (default
+        HIDE_EXPIRED_JOBS, read per call so it can be switched at runtime) is off.
+        """
+        hide_expired = HIDE_EXPIRED_JOBS if hide_expired is None else hide_expired
+        today = day_number() if today is None else today
+        mask = self._filter_mask(spec)
+
+        if spec.closing is not None:
+            # The window starts today, so it never contains expired jobs
+            positions = self.dates.closing_within(today, spec.closing)
+            return positions if mask is None else positions[mask[positions]]
+
+        live = self.dates.open_rows(today) if hide_expired else None
+        if mask is None:
+            if spec.latest:
+                positions = self.dates.by_recency if live is None else live[2]
+            elif live is None or len(live[1]) == self.size:
+                return None
+            else:
+                positions = live[1]
+        else:
+            if live is not None:
+                mask = mask & live[0]
+            positions = np.flatnonzero(mask)
+            if spec.latest:
+                positions = self.dates.newest_first(positions)
+        return positions[:LATEST_LIMIT] if spec.latest else positions
+
+# -----------------------------
+# FACET COUNTS
+# -----------------------------
+FACET_COLUMNS = ['Category', 'Location', 'Experience', 'Qualification']
+
+
+def _value_mask(values, pattern):
+    """Case-insensitive regex match over an array of distinct values (None never matches)"""
+    return pd.Series(values, dtype=object).str.contains(pattern, case=False, na=False).to_numpy(dtype=bool)
+
+
+class FacetIndex:
+    """Job counts for any combination of category, location, experience and degree filters
+
+    Rows are grouped once by their distinct (Category, Location, Experience,
+    Qualification) values. A filter becomes one boolean per distinct value,
+    so a count sums a few thousand group totals instead of scanning rows.
+    Totals of still-open jobs are re-aggregated once per day.
+    """
+
+    def __init__(self, data, parser, dates):
+        self.dates = dates
+        self.values = {}
+        codes = []
+        for column in FACET_COLUMNS:
+            column_codes, uniques = pd.factorize(data[column])
+            # Slot 0 holds missing values (factorize codes them -1)
+            self.values[column] = np.array([None] + list(uniques), dtype=object)
+            codes.append(column_codes + 1)
+        shape = [len(self.values[column]) for column in FACET_COLUMNS]
+        keys, self.group_of_row = np.unique(np.ravel_multi_index(codes, shape), return_inverse=True)
+        self.group_of_row = self.group_of_row.ravel()
+        self.group_values = dict(zip(FACET_COLUMNS, np.unravel_index(keys, shape)))
+        self.totals = np.bincount(self.group_of_row, minlength=len(keys))
+
+        self.location = {pattern: _value_mask(self.values['Location'], pattern) for pattern in parser.location_patterns}
+        self.degree = {pattern: _value_mask(self.values['Qualification'], pattern) for pattern in parser.degree_patterns}
+        self.years = required_years(pd.Series(self.values['Experience'], dtype=object))
+        self._open = (None, None)  # (day, open jobs per group)
+
+    def _any(self, postings, keys, column):
+        allowed = np.zeros(len(self.values[column]), dtype=bool)
+        for key in keys:
+            allowed |= postings[key]
+        return allowed
+
+    def _group_mask(self, spec):
+        """Groups whose values pass every filter of the spec"""
+        mask = np.ones(len(self.totals), dtype=bool)
+        allowed = {}
+        if spec.categories:
+            allowed['Category'] = np.isin(self.values['Category'], list(spec.categories))
+        if spec.locations:
+            allowed['Location'] = self._any(self.location, spec.locations, 'Location')
+        if spec.experience is not None:
+            allowed['Experience'] = experience_mask(self.years, *spec.experience)
+        if spec.degrees:
+            allowed['Qualification'] = self._any(self.degree, spec.degrees, 'Qualification')
+        for column, values_ok in allowed.items():
+            mask &= values_ok[self.group_values[column]]
+        return mask
+
+    def group_totals(self, today=None, hide_expired=None):
+        """Jobs per group, counting only open ones unless hide_expired (default HIDE_EXPIRED_JOBS) is off"""
+        hide_expired = HIDE_EXPIRED_JOBS if hide_expired is None else hide_expired
+        if not hide_expired:
+            return self.totals
+        today = day_number() if today is None else today
+        day, totals = self._open
+        if day != today:
+            open_mask = self.dates.open_rows(today)[0]
+            totals = np.bincount(self.group_of_row[open_mask], minlength=len(self.totals))
+            self._open = (today, totals)
+        return totals
+
+    def count(self, spec, today=None, hide_expired=None):
+        """Number of jobs matching the spec's category/location/experience/degree filters"""
+        return int(self.group_totals(today, hide_expired)[self._group_mask(spec)].sum())
+
+    def breakdown(self, spec, column, today=None, hide_expired=None):
+        """{value: count} of the jobs matching the spec, split by one column, largest first"""
+        mask = self._group_mask(spec)
+        totals = self.group_totals(today, hide_expired)
+        counts = np.bincount(self.group_values[column][mask], weights=totals[mask],
+                             minlength=len(self.values[column])).astype(np.int64)
+        order = np.argsort(-counts, kind="stable")
+        return {self.values[column][i]: int(counts[i]) for i in order if i and counts[i]}
+
+    def pattern_counts(self, spec, column, patterns, today=None, hide_expired=None):
+        """{pattern: count} of the jobs matching the spec and each Location/Qualification pattern"""
+        mask = self._group_mask(spec)
+        totals = self.group_totals(today, hide_expired)
+        postings = self.location if column == 'Location' else self.degree
+        return {pattern: int(totals[mask & postings[pattern][self.group_values[column]]].sum())
+                for pattern in patterns}
+
+
+def pattern_label(pattern):
+    """Readable name for a location/degree pattern: its first alternative, unescaped"""
+    first = pattern.split("|")[0].replace(WORD_START, "").replace(WORD_END, "")
+    return re.sub(r"\\(.)", r"\1", first)
+
+
+def describe_spec(spec):
+    """Short English description of a spec's filters, e.g. 'Science jobs in Delhi for freshers'"""
+    text = "/".join(spec.categories) + " jobs" if spec.categories else "jobs"
+    if spec.locations:
+        text += " in " + " or ".join(pattern_label(pattern) for pattern in spec.locations)
+    if spec.experience == (0, 0):
+        text += " for freshers"
+    elif spec.experience is not None:
+        low, high = spec.experience
+        if high is None:
+            text += " needing experience" if low <= 1 else f" needing {low}+ years"
+        else:
+            text += f" needing {low}-{high} years" if low != high else f" needing {low} years"
+    if spec.degrees:
+        text += " requiring " + " or ".join(pattern_label(pattern) for pattern in spec.degrees)
+    return text
+
+# Location values that are not places, so make poor facet chips
+NON_PLACE_LOCATIONS = {"check notification", "-", ""}
+FACET_CHIP_LOCATIONS = 5
+FACET_CHIP_DEGREES = 4
+
+
+def build_facet_samples(snap, today=None):
+    """Facet chips with live job counts: categories, top locations, experience and top degrees
+
+    Each chip is a query plus its count; the count comes from parsing that very
+    query, so clicking a chip shows exactly that many jobs.
+    """
+    facets = snap.facets
+    everything = QuerySpec()
+    queries = [f"{category} jobs" for category in facets.breakdown(everything, 'Category', today)]
+    locations = [value for value in facets.breakdown(everything, 'Location', today)
+                 if str(value).strip().lower() not in NON_PLACE_LOCATIONS]
+    queries += [f"Jobs in {value}" for value in locations[:FACET_CHIP_LOCATIONS]]
+    queries += ["Fresher jobs", "Jobs with experience"]
+    patterns = sorted({degree_pattern(terms) for terms in DEGREE_ALIASES.values()})
+    degrees = facets.pattern_counts(everything, 'Qualification', patterns, today)
+    top_degrees = sorted(degrees, key=degrees.get, reverse=True)[:FACET_CHIP_DEGREES]
+    queries += [f"Jobs requiring {pattern_label(pattern)}" for pattern in top_degrees if degrees[pattern]]
+
+    chips = []
+    for query in queries:
+        count = facets.count(snap.parser.parse(query), today)
+        if count:
+            chips.append([f"{query} ({count})"])
+    return chips
+
+
+def facet_samples(snap=None):
+    """The snapshot's facet chips; set_dataset builds them, and they are rebuilt when the day changes"""
+    snap = snap or snapshot
+    today = day_number()
+    day, chips = snap.facet_chips
+    if day != today:
+        chips = build_facet_samples(snap, today)
+        snap.facet_chips = (today, chips)
+    return chips
+
+# -----------------------------
+# CANDIDATE RETRIEVAL (BM25)
+# -----------------------------
+RETRIEVAL_FIELDS = ['Title', 'Organization', 'Category', 'Qualification', 'Location']
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+def job_text(data, fields=RETRIEVAL_FIELDS):
+    """The searchable text of every row: the given fields joined by spaces"""
+    text = data[fields[0]].astype(object).fillna("").astype(str)
+    for field in fields[1:]:
+        text = text + " " + data[field].astype(object).fillna("").astype(str)
+    return text
+
+
+class BM25Retriever:
+    """Okapi BM25 over the descriptive job fields, used to pre-select LLM candidates"""
+
+    def __init__(self, data, fields=RETRIEVAL_FIELDS, k1=1.5, b=0.75):
+        self.size = len(data)
+        self.k1 = k1
+        self.b = b
+
+        text = job_text(data, fields)
+
+        postings = {}
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for row, doc in enumerate(text):
+            tokens = tokenize(doc)
+            lengths[row] = len(tokens)
+            for term, count in Counter(tokens).items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(row)
+                postings[term][1].append(count)
+
+        average = lengths.mean() if self.size else 0.0
+        self.norm = k1 * (1 - b + b * lengths / average) if average else np.full(self.size, k1, dtype=np.float32)
+        self.postings = {}
+        for term, (rows, counts) in postings.items():
+            idf = np.log(1 + (self.size - len(rows) + 0.5) / (len(rows) + 0.5))
+            self.postings[term] = (np.array(rows, dtype=np.int64), np.array(counts, dtype=np.float32), idf)
+
+    def scores(self, query):
+        """BM25 score of every row for the query"""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            rows, counts, idf = self.postings[term]
+            scores[rows] += idf * counts * (self.k1 + 1) / (counts + self.norm[rows])
+        return scores
+
+    def top_k(self, query, k, allowed=None):
+        """Row positions of the k best-scoring jobs, best first (only rows with a positive score)"""
+        scores = self.scores(query)
+        if allowed is not None:
+            scores = np.where(allowed, scores, 0)
+        k = min(k, self.size)
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return best[scores[best] > 0]
+
+
+def retrieve_candidates(user_query, k=None, snap=None):
+    """Pick the k rows to show the LLM: BM25 hits first, then the local filter results"""
+    snap = snap or snapshot
+    k = RETRIEVAL_TOP_K if k is None else k
+    with span("retrieve"):
+        candidates = list(snap.retriever.top_k(user_query, k, open_jobs(snap)))
+        if len(candidates) < k:
+            seen = set(candidates)
+            positions = snap.search_index.lookup(snap.parser.parse(user_query))
+            fallback = range(len(snap.df)) if positions is None else positions
+            for position in fallback:
+                if len(candidates) >= k:
+                    break
+                if position not in seen:
+                    seen.add(position)
+                    candidates.append(int(position))
+    return [int(position) for position in candidates]
+
+
+# -----------------------------
+# SEMANTIC SEARCH (OFFLINE)
+# -----------------------------
+def _token_features(token, cache):
+    """Hashed character 3/4-grams of a word (plus the word itself), memoized per token"""
+    features = cache.get(token)
+    if features is None:
+        padded = f" {token} "
+        grams = {padded[i:i + n] for n in (3, 4) for i in range(len(padded) - n + 1)}
+        grams.add(padded)
+        # crc32 rather than hash(): vectors persisted to disk must hash the same in every process
+        features = np.array([zlib.crc32(gram.encode('utf-8')) % SEMANTIC_DIM for gram in grams], dtype=np.int64)
+        cache[token] = features
+    return features
+
+
+def _text_features(text, cache):
+    features = [_token_features(token, cache) for token in tokenize(text)]
+    return np.concatenate(features) if features else np.array([], dtype=np.int64)
+
+
+class SemanticIndex:
+    """Hashed char-n-gram TF-IDF vectors for every job, stored as a sparse column-major matrix
+
+    Vectors are computed once per distinct job text; a query is scored against
+    all of them with a single sparse matrix-vector product, so spelling and
+    word-form variants ("chemists" / "chemistry") still find each other.
+    """
+
+    def __init__(self, codes, indptr, indices, values, idf):
+        self.codes = codes  # row -> distinct text id
+        self.indptr = indptr  # feature -> slice of indices/values
+        self.indices = indices  # distinct text ids
+        self.values = values  # L2-normalised TF-IDF weights
+        self.idf = idf
+        self.n_texts = int(codes.max()) + 1 if len(codes) else 0
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.codes, self.indptr, self.indices, self.values, self.idf))
+
+    @classmethod
+    def build(cls, data, fields=RETRIEVAL_FIELDS):
+        codes, texts = pd.factorize(job_text(data, fields))
+        cache = {}
+        doc_parts, feature_parts = [], []
+        for doc, text in enumerate(texts):
+            features = _text_features(text, cache)
+            doc_parts.append(np.full(len(features), doc, dtype=np.int64))
+            feature_parts.append(features)
+        docs = np.concatenate(doc_parts) if doc_parts else np.array([], dtype=np.int64)
+        features = np.concatenate(feature_parts) if feature_parts else np.array([], dtype=np.int64)
+
+        # Term frequencies per (doc, feature) pair
+        keys, tf = np.unique(docs * SEMANTIC_DIM + features, return_counts=True)
+        docs, features = keys // SEMANTIC_DIM, keys % SEMANTIC_DIM
+
+        doc_freq = np.bincount(features, minlength=SEMANTIC_DIM)
+        idf = (np.log((1 + len(texts)) / (1 + doc_freq)) + 1).astype(np.float32)
+        values = (1 + np.log(tf)) * idf[features]
+        norms = np.sqrt(np.bincount(docs, weights=values ** 2, minlength=len(texts)))
+        values = values / norms[docs]
+
+        # Column-major so a query only reads the columns of its own n-grams
+        order = np.argsort(features, kind="stable")
+        indptr = np.zeros(SEMANTIC_DIM + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(doc_freq)
+        return cls(codes.astype(np.int32), indptr, docs[order].astype(np.int32),
+                   values[order].astype(np.float32), idf)
+
+    def save(self, path, fingerprint):
+        np.savez(path, codes=self.codes, indptr=self.indptr, indices=self.indices,
+                 values=self.values, idf=self.idf, fingerprint=np.array(fingerprint))
+
+    @staticmethod
+    def saved_fingerprint(path):
+        """Fingerprint of the vectors saved at path, or None when there are none"""
+        try:
+            with np.load(path) as saved:
+                return str(saved["fingerprint"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @classmethod
+    def load_or_build(cls, data, fingerprint, path=None):
+        """Reuse vectors saved at path for this exact dataset version, otherwise build them"""
+        if path and os.path.exists(path):
+            try:
+                with np.load(path) as saved:
+                    if str(saved["fingerprint"]) == fingerprint and len(saved["indptr"]) == SEMANTIC_DIM + 1:
+                        return cls(saved["codes"], saved["indptr"], saved["indices"], saved["values"], saved["idf"])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Ignoring unreadable vectors file {path}: {e}")
+        start = time.perf_counter()
+        index = cls.build(data)
+        print(f"🧮 Built {index.n_texts} job vectors in {time.perf_counter() - start:.2f}s")
+        return index
+
+    def scores(self, query):
+        """Cosine similarity of the query to every row"""
+        features, tf = np.unique(_text_features(query, {}), return_counts=True)
+        if not len(features) or not self.n_texts:
+            return np.zeros(len(self.codes), dtype=np.float32)
+        weights = (1 + np.log(tf)) * self.idf[features]
+        weights /= np.sqrt((weights ** 2).sum())
+
+        starts, ends = self.indptr[features], self.indptr[features + 1]
+        rows = np.concatenate([self.indices[start:end] for start, end in zip(starts, ends)])
+        values = np.concatenate([self.values[start:end] * weight for start, end, weight in zip(starts, ends, weights)])
+        text_scores = np.bincount(rows, weights=values, minlength=self.n_texts)
+        return text_scores[self.codes]
+
+    def top_k(self, query, k, min_score=0.0, allowed=None):
+        """Row positions of the k most similar jobs scoring above min_score, best first"""
+        scores = self.scores(query)
+        if allowed is not None:
+            scores = np.where(allowed, scores, 0)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return best[scores[best] > min_score]
+
+
+# -----------------------------
+# CACHING
+# -----------------------------
+def normalize_query(user_query):
+    """Canonical form of a query for cache keys: lowercase tokens, single-spaced"""
+    return " ".join(tokenize(user_query))
+
+
+def format_job_context(i, job):
+    """Serialize one job for the Gemini prompt"""
+    return f"""
+Job {i}:
+- Title: {job['Title']}
+- Organization: {job['Organization']}
+- Category: {job['Category']}
+- Location: {job['Location']}
+- Salary: {job['Salary']}
+- Experience: {job['Experience']}
+- Qualification: {job['Qualification']}
+- Last Date: {job['Last Date']}
+---
+"""
+
+
+def build_job_contexts(data, reuse=None, unchanged=None):
+    """Serialize every row once per dataset version, indexed by row position
+
+    Rows flagged in unchanged keep their string from reuse (the previous
+    version's contexts), so a reload only serializes new or edited rows.
+    """
+    if reuse is None:
+        return [format_job_context(i, job) for i, job in enumerate(data.to_dict('records'))]
+    contexts = reuse[:len(data)] + [None] * max(len(data) - len(reuse), 0)
+    changed = np.flatnonzero(~unchanged)
+    for i, job in zip(changed, data.iloc[changed].to_dict('records')):
+        contexts[i] = format_job_context(i, job)
+    return contexts
+
+
+def hash_rows(data):
+    """Per-row content hash over the source (JSON) columns"""
+    columns = [column for column in data.columns if column not in DATE_COLUMNS.values()]
+    return pd.util.hash_pandas_object(data[columns], index=False).to_numpy()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry TTL and hit/miss counters"""
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Parsed Gemini results: (normalized query, top_k, dataset fingerprint) -> (answer, row positions)
+llm_cache = LRUCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL)
+
+# -----------------------------
+# DATASET STATE
+# -----------------------------
+class JobSnapshot:
+    """One dataset version together with everything derived from it
+
+    Snapshots are never modified after construction (apart from the lazily
+    filled card cache). Request handlers read the module-level `snapshot`
+    once and use only that object, so a reload swapping in a new version
+    never mixes two datasets within one request.
+    """
+
+    def __init__(self, data, version=1, previous=None, vectors_path=None):
+        self.df = data
+        self.version = version
+        self.row_hashes = hash_rows(data)
+        self.fingerprint = hashlib.sha1(self.row_hashes.tobytes()).hexdigest()[:12]
+        self.parser = QueryParser(data)
+        self.search_index = SearchIndex(data, self.parser)
+        self.facets = FacetIndex(data, self.parser, self.search_index.dates)
+        self.retriever = BM25Retriever(data)
+        self.semantic = SemanticIndex.load_or_build(data, self.fingerprint, vectors_path)
+
+        # Rows identical to the previous version keep their serialized forms
+        unchanged = np.zeros(len(data), dtype=bool)
+        if previous is not None:
+            shared = min(len(data), len(previous.df))
+            unchanged[:shared] = self.row_hashes[:shared] == previous.row_hashes[:shared]
+            self.job_contexts = build_job_contexts(data, previous.job_contexts, unchanged)
+            self.job_card_cache = {job_id: card for job_id, card in previous.job_card_cache.items()
+                                   if job_id < len(data) and unchanged[job_id]}
+        else:
+            self.job_contexts = build_job_contexts(data)
+            self.job_card_cache = {}
+        self.changed_rows = int(len(data) - unchanged.sum())
+        # (day, chips) filled by set_dataset; counts of open jobs change at midnight
+        self.facet_chips = (None, None)
+
+
+snapshot = None
+_dataset_lock = threading.Lock()
+# (dataset version, pool) of local search processes forked from that version's snapshot
+worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def set_dataset(data, vectors_path=None):
+    """Build a snapshot for data and atomically make it the current one
+
+    vectors_path is where saved semantic vectors may be reused from; only pass it for DATA_PATH itself.
+    Running local search workers are re-forked from the new snapshot.
+    """
+    global snapshot, df
+    if worker_pool is not None:
+        # start_workers froze the heap; without this no replaced snapshot could ever be freed
+        gc.unfreeze()
+    with _dataset_lock:
+        previous = snapshot
+        new_snapshot = JobSnapshot(data, version=previous.version + 1 if previous else 1, previous=previous,
+                                   vectors_path=vectors_path)
+        facet_samples(new_snapshot)
+        # A single reference assignment: readers see the old or the new version, never a mix
+        snapshot = new_snapshot
+        df = data
+    llm_cache.clear()
+    if worker_pool is not None:
+        fork_workers(new_snapshot)
+    return new_snapshot
+
+
+set_dataset(df, vectors_path=VECTORS_PATH)
+
+
+def persist_dataset(snap=None):
+    """Save the Arrow snapshot and semantic vectors of DATA_PATH for the next start
+
+    Only the server and `python app.py --write-snapshot` call this, so importing
+    app (batch.py, benchmark.py, tests) never writes next to the dataset.
+    """
+    snap = snap or snapshot
+    if not snapshot_is_fresh():
+        write_snapshot(snap.df)
+    if SemanticIndex.saved_fingerprint(VECTORS_PATH) != snap.fingerprint:
+        try:
+            snap.semantic.save(VECTORS_PATH, snap.fingerprint)
+        except OSError as e:
+            print(f"⚠️ Could not save vectors to {VECTORS_PATH}: {e}")
+
+# -----------------------------
+# HOT RELOAD
+# -----------------------------
+def _json_body_length(raw):
+    """Byte length of a JSON array document up to (not including) its closing bracket"""
+    stripped = raw.rstrip()
+    if not stripped.endswith(b"]"):
+        return None
+    return len(stripped[:-1].rstrip())
+
+
+def read_source_info(raw):
+    """What a later reload needs to recognise a pure append to this file content"""
+    length = _json_body_length(raw)
+    return {"body_length": length, "body_hash": hashlib.sha1(raw[:length]).hexdigest() if length else None}
+
+
+def _appended_records(raw, source):
+    """Records added after the previously seen content, or None if the file changed otherwise"""
+    length = source.get("body_length")
+    if not length or len(raw) <= length:
+        return None
+    if hashlib.sha1(raw[:length]).hexdigest() != source["body_hash"]:
+        return None
+    tail = raw[length:].lstrip()
+    if not tail.startswith(b","):
+        return None
+    try:
+        records = json.loads(b"[" + tail[1:])
+    except ValueError:
+        return None
+    return records if isinstance(records, list) else None
+
+
+def append_jobs(data, new_rows):
+    """Concatenate compacted frames, merging categorical dictionaries"""
+    combined = pd.concat([data, new_rows], ignore_index=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in combined and not isinstance(combined[column].dtype, pd.CategoricalDtype):
+            combined[column] = union_categoricals([data[column], new_rows[column]], ignore_order=True)
+    return combined
+
+
+def reload_data(path=DATA_PATH, source=None):
+    """Load path into a new snapshot, parsing only appended records when possible
+
+    Only the JSON parse is incremental: the snapshot's indexes (parser, BM25,
+    semantic vectors, dates, facets) are rebuilt over every row, and just the
+    prompt contexts and job cards of unchanged rows are carried over.
+    Returns the source info to pass to the next reload.
+    """
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        raw = f.read()
+
+    previous = snapshot
+    appended = _appended_records(raw, source or {})
+    if appended is not None:
+        data = append_jobs(previous.df, compact_jobs(pd.DataFrame(appended)))
+        mode = f"{len(appended)} appended records parsed"
+    else:
+        data = compact_jobs(pd.DataFrame(json.loads(raw)))
+        mode = "full parse"
+
+    is_main_dataset = os.path.abspath(path) == os.path.abspath(DATA_PATH)
+    new_snapshot = set_dataset(data, vectors_path=VECTORS_PATH if is_main_dataset else None)
+    if is_main_dataset:
+        persist_dataset(new_snapshot)
+    print(f"🔄 Reloaded {len(data)} jobs as v{new_snapshot.version} ({mode}, "
+          f"{new_snapshot.changed_rows} new/changed rows) in {time.perf_counter() - start:.2f}s")
+    return read_source_info(raw)
+
+
+class DatasetWatcher(threading.Thread):
+    """Background thread that hot-reloads the dataset when its file changes"""
+
+    def __init__(self, path=DATA_PATH, interval=DATA_RELOAD_INTERVAL):
+        super().__init__(name="dataset-watcher", daemon=True)
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._stat = None
+        self._source = {}
+
+    def _file_stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def run(self):
+        try:
+            self._stat = self._file_stat()
+            with open(self.path, 'rb') as f:
+                self._source = read_source_info(f.read())
+        except OSError as e:
+            print(f"⚠️ Dataset watcher could not read {self.path}: {e}")
+
+        while not self._stopped.wait(self.interval):
+            try:
+                stat = self._file_stat()
+            except OSError:
+                continue
+            if stat == self._stat:
+                continue
+            # Remember the version we tried so a broken file is retried only after it changes again
+            self._stat = stat
+            try:
+                self._source = reload_data(self.path, self._source)
+            except Exception as e:
+                # Any malformed file (bad JSON, a row that is a list, a non-string field, ...)
+                # must leave the current snapshot serving and this thread alive
+                print(f"❌ Dataset reload failed, keeping v{snapshot.version}: {e!r}")
+                metrics.inc("jobyaari_dataset_reload_failures_total")
+
+    def stop(self):
+        self._stopped.set()
+
 # -----------------------------
 # ENHANCED SEARCH FUNCTIONS
 # -----------------------------
-def enhanced_simple_search(user_query):
+def open_jobs(snap):
+    """Mask of jobs still accepting applications today, or None when expired jobs are shown"""
+    return snap.search_index.dates.open_rows(day_number())[0] if HIDE_EXPIRED_JOBS else None
+
+
+def date_summary(snap, days=7):
+    """One line of posting/deadline counts for date-related answers"""
+    counts = snap.search_index.dates.window_counts(day_number(), days)
+    return (f"🗓️ {counts['posted']} posted in the last {days} days • "
+            f"{counts['closing']} closing within {days} days • {counts['open']} open in total")
+
+
+def enhanced_simple_search(user_query, snap=None, spec=None):
     """Enhanced fallback search with experience and qualification filtering"""
-    query_lower = user_query.lower()
-    results = df.copy()
-    
-    # Category filtering
-    if "engineering" in query_lower:
-        results = results[results['Category'] == 'Engineering']
-    elif "science" in query_lower:
-        results = results[results['Category'] == 'Science']
-    elif "commerce" in query_lower:
-        results = results[results['Category'] == 'Commerce']
-    elif "education" in query_lower:
-        results = results[results['Category'] == 'Education']
-    
-    # Location filtering
-    if "delhi" in query_lower:
-        results = results[results['Location'].str.contains('Delhi', case=False, na=False)]
-    elif "bangalore" in query_lower or "bengaluru" in query_lower:
-        results = results[results['Location'].str.contains('Bangalore|Bengaluru', case=False, na=False)]
-    elif "mumbai" in query_lower:
-        results = results[results['Location'].str.contains('Mumbai', case=False, na=False)]
-    elif "chennai" in query_lower:
-        results = results[results['Location'].str.contains('Chennai', case=False, na=False)]
-    elif "hyderabad" in query_lower:
-        results = results[results['Location'].str.contains('Hyderabad', case=False, na=False)]
-    elif "kolkata" in query_lower:
-        results = results[results['Location'].str.contains('Kolkata', case=False, na=False)]
-    elif "pune" in query_lower:
-        results = results[results['Location'].str.contains('Pune', case=False, na=False)]
-    
-    # Experience filtering - handle specific experience requirements
-    if "1 year" in query_lower or "one year" in query_lower:
-        results = results[results['Experience'].str.contains('1 year|1 Year|one year|1yr', case=False, na=False)]
-    elif "2 year" in query_lower or "two year" in query_lower:
-        results = results[results['Experience'].str.contains('2 year|2 Year|two year|2yr', case=False, na=False)]
-    elif "3 year" in query_lower or "three year" in query_lower:
-        results = results[results['Experience'].str.contains('3 year|3 Year|three year|3yr', case=False, na=False)]
-    elif "fresher" in query_lower or "freshers" in query_lower or "no experience" in query_lower:
-        results = results[results['Experience'].str.contains('fresher|Fresher|no experience|0 year', case=False, na=False)]
-    elif "experience" in query_lower:
-        # If user asks about experience but doesn't specify, show jobs with experience requirements
-        results = results[~results['Experience'].str.contains('fresher|Fresher', case=False, na=False)]
-    
-    # Qualification filtering
-    if "qualification" in query_lower or "education" in query_lower:
-        # If user asks about qualifications, show jobs with specific qualification requirements
-        if "b.tech" in query_lower or "btech" in query_lower or "b.e" in query_lower:
-            results = results[results['Qualification'].str.contains('B.Tech|B.E|Engineering|BE|BTech', case=False, na=False)]
-        elif "b.sc" in query_lower or "bsc" in query_lower:
-            results = results[results['Qualification'].str.contains('B.Sc|Science|BSC', case=False, na=False)]
-        elif "b.com" in query_lower or "bcom" in query_lower:
-            results = results[results['Qualification'].str.contains('B.Com|Commerce|BCOM', case=False, na=False)]
-        elif "m.tech" in query_lower or "mtech" in query_lower or "m.e" in query_lower:
-            results = results[results['Qualification'].str.contains('M.Tech|M.E|ME|MTech', case=False, na=False)]
-        elif "m.sc" in query_lower or "msc" in query_lower:
-            results = results[results['Qualification'].str.contains('M.Sc|MSC', case=False, na=False)]
-        elif "mba" in query_lower:
-            results = results[results['Qualification'].str.contains('MBA', case=False, na=False)]
-        elif "phd" in query_lower:
-            results = results[results['Qualification'].str.contains('PhD|Ph.D', case=False, na=False)]
-    
-    # Latest notifications/updates
-    if "latest" in query_lower or "recent" in query_lower or "new" in query_lower or "notifications" in query_lower:
-        # Show all jobs for now (you can add date-based sorting later)
-        results = results.head(15)  # Show first 15 as latest
-    
-    # Total count queries
-    if "total" in query_lower or "count" in query_lower or "how many" in query_lower:
-        results = df
-    
+    snap = snap or snapshot
+    if spec is None:
+        with span("parse"):
+            spec = snap.parser.parse(user_query)
+
+    # Every filter is a lookup into the prebuilt index - no per-query scans
+    with span("filter"):
+        positions = snap.search_index.lookup(spec)
+    results = snap.df if positions is None else snap.df.iloc[positions]
+
+    if len(results) == 0 and HIDE_EXPIRED_JOBS and spec.closing is None:
+        closed = snap.search_index.lookup(spec, hide_expired=False)
+        closed_count = len(snap.df) if closed is None else len(closed)
+        if closed_count:
+            return f"⌛ All {closed_count} matching jobs have already closed - their last dates are past. New notifications pop up all the time, so check back soon! 🔔", results
+
     # Use our improved response formatter
-    return create_funny_response(user_query, len(results), results)
+    response, results = create_funny_response(user_query, len(results), results, spec, snap)
+    if spec.latest or spec.closing is not None:
+        response += "\n\n" + date_summary(snap)
+    return response, results
+
+# Intents that are small talk rather than a description of a job
+SMALL_TALK_INTENTS = {"greeting", "faq", "get_job", "count", "thanks", "bye"}
+
+
+def semantic_search(user_query, snap=None, spec=None):
+    """Jobs most similar to the query text, or None when nothing is similar enough"""
+    snap = snap or snapshot
+    with span("semantic"):
+        positions = snap.semantic.top_k(user_query, SEMANTIC_TOP_K, SEMANTIC_MIN_SCORE, open_jobs(snap))
+    if not len(positions):
+        return None
+    results = snap.df.iloc[positions]
+    return create_funny_response(user_query, len(results), results, spec, snap)
+
+
+def local_search(user_query, snap=None):
+    """Offline search: keyword filters when the query names any, semantic similarity otherwise"""
+    snap = snap or snapshot
+    with span("parse"):
+        spec = snap.parser.parse(user_query)
+    has_filters = spec.categories or spec.locations or spec.experience or spec.degrees
+    if not (has_filters or spec.total or spec.latest or spec.closing is not None or spec.intent in SMALL_TALK_INTENTS):
+        found = semantic_search(user_query, snap, spec)
+        if found is not None:
+            return found
+    return enhanced_simple_search(user_query, snap, spec)
 
 # -----------------------------
-# NLP-POWERED SEARCH WITH FALLBACK
+# LOCAL SEARCH WORKERS
 # -----------------------------
-def smart_search_with_nlp(user_query):
-    """Use LangChain + Gemini with fallback to enhanced simple search"""
-    
-    # If Gemini is not available, use enhanced simple search
-    if llm is None:
-        return enhanced_simple_search(user_query)
-    
+def _init_worker():
+    """Runs first in every forked worker
+
+    A lock held by another thread at fork time would stay held forever in the
+    worker, so the ones a search can touch are replaced. Freezing is cheap
+    here (it only relinks the generation lists) and keeps the worker's GC off
+    the inherited pages, also for pools re-forked after a reload.
+    """
+    global _trace_lock, _dataset_lock, _worker_pool_lock
+    metrics._lock = threading.Lock()
+    _trace_lock = threading.Lock()
+    _dataset_lock = threading.Lock()
+    _worker_pool_lock = threading.Lock()
+    gc.freeze()
+
+
+def _worker_local_search(user_query):
+    """local_search in a worker, against the snapshot it inherited; results go back as row positions"""
+    response, results = local_search(user_query)
+    return response, results.index.to_numpy()
+
+
+def fork_workers(snap, replacing=None):
+    """Replace the pool with WORKERS processes forked from snap, sharing it copy-on-write
+
+    Called by start_workers and after every reload, never on the request path.
+    The old pool is drained rather than cancelled: requests already queued on
+    it still run there, against the version they read. With replacing, only a
+    pool that is still the current one is replaced.
+    """
+    global worker_pool
+    with _worker_pool_lock:
+        previous = worker_pool
+        if replacing is not None and previous is not replacing:
+            return
+        pool = ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context("fork"), initializer=_init_worker)
+        # Fork every worker now instead of on the first request that needs one
+        pool.submit(int).result()
+        worker_pool = (snap.version, pool)
+    if previous is not None:
+        previous[1].shutdown(wait=False)
+
+
+def start_workers():
+    """Fork the workers now, before the server starts its threads"""
+    # Move everything built so far out of the collector's reach, so the server's
+    # GC never writes to (and so un-shares) the pages the workers inherit. Done
+    # once: set_dataset unfreezes again so a replaced snapshot can be freed
+    gc.collect()
+    gc.freeze()
+    fork_workers(snapshot)
+    print(f"👷 {WORKERS} local search workers sharing dataset v{snapshot.version}")
+
+
+async def local_search_async(user_query, snap=None):
+    """local_search, run in a worker process when WORKERS > 1 so the event loop stays free"""
+    snap = snap or snapshot
+    pool = worker_pool
+    if WORKERS <= 1 or pool is None or pool[0] != snap.version:
+        # No workers, or they were forked from another dataset version than this request reads
+        return local_search(user_query, snap)
     try:
-        # Convert all jobs to context for Gemini
-        jobs_context = ""
-        for i, job in df.iterrows():
-            jobs_context += f"""
-Job {i}:
-- Title: {job['Title']}
-- Organization: {job['Organization']}
-- Category: {job['Category']}
-- Location: {job['Location']}
-- Salary: {job['Salary']}
-- Experience: {job['Experience']}
-- Qualification: {job['Qualification']}
-- Last Date: {job['Last Date']}
----
-"""
-        
-        # Create NLP prompt for LangChain
-        prompt = f"""
-        USER QUERY: "{user_query}"
+        with span("worker"):
+            response, positions = await asyncio.get_running_loop().run_in_executor(
+                pool[1], _worker_local_search, user_query)
+    except BrokenProcessPool:
+        print("❌ A search worker died, restarting the pool")
+        threading.Thread(target=fork_workers, args=(snapshot, pool), name="worker-restart", daemon=True).start()
+        return local_search(user_query, snap)
+    except RuntimeError:
+        # A reload retired this pool between reading it and submitting to it
+        return local_search(user_query, snap)
+    return response, snap.df.iloc[positions]
+
+# -----------------------------
+# NLP-POWERED SEARCH WITH FALLBACK
+# -----------------------------
+# Rough size of a token in prompt text, for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+# Longest user query quoted in the prompt
+MAX_PROMPT_QUERY_CHARS = 500
+# Per-call options: Gemini's JSON mode when enabled
+LLM_CALL_OPTIONS = {"generation_config": {"response_mime_type": "application/json"}} if LLM_JSON_MODE else {}
+RETRY_NOTE = "\n        Your previous reply could not be read. Reply with the JSON object only.\n"
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def nlp_prompt(user_query, jobs_context):
+    return f"""
+        USER QUERY: "{user_query[:MAX_PROMPT_QUERY_CHARS]}"
         
-        JOB DATABASE:
+        CANDIDATE JOBS:
         {jobs_context}
         
         INSTRUCTIONS:
         1. Understand the user's intent using NLP
-        2. Find the most relevant job indices (0-based) from the database
-        3. Return a natural, helpful response with emojis and friendly tone
+        2. Find the most relevant jobs among the candidates and use their Job numbers as indices
+        3. Write a natural, helpful answer with emojis and friendly tone
         4. Always include matching indices
         5. Pay special attention to experience requirements, qualifications, categories, and locations
         
-        RESPONSE FORMAT:
-        ANSWER: [Your natural language response with emojis here]
-        INDICES: [comma-separated numbers or "all"]
+        RESPONSE FORMAT (a single JSON object, nothing else):
+        {{"answer": "<your answer>", "jobs": [<Job numbers>] or "all"}}
         """
-        
-        # Use LangChain to process with Gemini
-        response = llm([HumanMessage(content=prompt)])
-        response_text = response.content
-        
-        print(f"🤖 NLP Analysis: {response_text}")
-        
-        # Parse the response
-        if "ANSWER:" in response_text and "INDICES:" in response_text:
-            answer = response_text.split("ANSWER:")[1].split("INDICES:")[0].strip()
-            indices_text = response_text.split("INDICES:")[1].strip()
-            
-            if indices_text.lower() == "all":
-                results = df
-            else:
-                # Extract indices from response
-                indices = []
-                for part in indices_text.split(','):
-                    part = part.strip()
-                    if part.isdigit() and int(part) < len(df):
-                        indices.append(int(part))
-                
-                if indices:
-                    results = df.iloc[indices]
-                else:
-                    results = pd.DataFrame()
+
+
+def build_nlp_prompt(user_query, candidates, snap, budget=LLM_PROMPT_TOKENS):
+    """(prompt, candidates kept): Gemini prompt over the best-ranked candidates that fit the token budget"""
+    with span("prompt"):
+        room = budget * CHARS_PER_TOKEN - len(nlp_prompt(user_query, ""))
+        contexts = []
+        for i in candidates:
+            room -= len(snap.job_contexts[i])
+            if room < 0:
+                break
+            contexts.append(snap.job_contexts[i])
+        if len(contexts) < len(candidates):
+            metrics.inc("jobyaari_llm_trimmed_candidates_total", len(candidates) - len(contexts))
+        prompt = nlp_prompt(user_query, "".join(contexts))
+    return prompt, candidates[:len(contexts)]
+
+
+def retry_prompt(prompt):
+    return prompt + RETRY_NOTE
+
+
+JSON_OBJECT = re.compile(r"\{.*\}", re.S)
+ANSWER_MARKER = re.compile(r"\**\s*answer\s*\**\s*:\s*\**", re.I)
+INDICES_MARKER = re.compile(r"\**\s*indices\s*\**\s*:\s*\**", re.I)
+# "7", "3-5", "3 – 5", "3 to 5" or "all"
+INDEX_TOKEN = re.compile(r"(\d+)\s*(?:-|–|to)\s*(\d+)|(\d+)|\b(all)\b", re.I)
+
+
+def parse_indices(value, candidates):
+    """Candidate row positions named by numbers, ranges, "all" or a list of these, in the order given"""
+    if not len(candidates):
+        return []
+    text = ", ".join(map(str, value)) if isinstance(value, list) else str(value)
+    allowed = set(candidates)
+    highest = max(allowed)
+    indices = []
+    for start, end, single, everything in INDEX_TOKEN.findall(text):
+        if everything:
+            return list(candidates)
+        # Only ids we actually sent count; ranges are clipped so a stray "1-99999999" stays cheap
+        numbers = range(int(start), min(int(end), highest) + 1) if start else (int(single),)
+        for number in numbers:
+            if number in allowed:
+                allowed.discard(number)
+                indices.append(number)
+    return indices
+
+
+def parse_nlp_response(response_text, candidates):
+    """Return (answer, row positions), or None if no answer can be read
+
+    Takes the JSON object the prompt asks for, even wrapped in code fences or
+    chatter, and falls back to "ANSWER: ... INDICES: ..." lines.
+    """
+    found = JSON_OBJECT.search(response_text)
+    if found:
+        try:
+            data = json.loads(found.group())
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and "answer" in data:
+            jobs = data.get("jobs", data.get("indices", []))
+            return str(data["answer"]).strip(), parse_indices(jobs, candidates)
+
+    answer = ANSWER_MARKER.search(response_text)
+    if answer is None:
+        return None
+    indices = INDICES_MARKER.search(response_text, answer.end())
+    if indices is None:
+        return None
+    # Indices end at the line break; anything after it is commentary
+    indices_text = response_text[indices.end():].strip().split("\n", 1)[0]
+    return response_text[answer.end():indices.start()].strip(), parse_indices(indices_text, candidates)
+
+
+def handle_nlp_response(response_text, candidates, cache_key):
+    """Parse a Gemini reply, caching it when well-formed; None when it cannot be read"""
+    with span("response_parse"):
+        parsed = parse_nlp_response(response_text, candidates)
+    if parsed is not None:
+        llm_cache.put(cache_key, parsed)
+        return parsed
+    # Not cached, so the next ask (or a retry) calls Gemini again
+    metrics.inc("jobyaari_llm_parse_failures_total")
+    return None
+
+
+def finish_nlp_search(user_query, parsed, snap):
+    """Turn parsed (answer, row positions) into the (response, results) pair"""
+    answer, indices = parsed
+    results = snap.df.iloc[indices]
+    
+    # Gemini's own answer when it wrote one, our formatter otherwise
+    if answer:
+        return answer, results
+    return create_funny_response(user_query, len(results), results, snap=snap)
+
+
+def smart_search_with_nlp(user_query, top_k=None):
+    """Use LangChain + Gemini with fallback to enhanced simple search"""
+    snap = snapshot
+    
+    # If Gemini is not available, use the local (semantic + keyword) search
+    if llm is None:
+        return local_search(user_query, snap)
+    
+    try:
+        top_k = RETRIEVAL_TOP_K if top_k is None else top_k
+        cache_key = (normalize_query(user_query), top_k, snap.fingerprint)
+        parsed = llm_cache.get(cache_key)
+
+        if parsed is None:
+            # Only the top-K retrieved jobs go into the prompt, under their row ids
+            candidates = retrieve_candidates(user_query, top_k, snap)
+            prompt, candidates = build_nlp_prompt(user_query, candidates, snap)
+
+            # Use LangChain to process with Gemini, asking again only if the reply is unreadable
+            for attempt in range(LLM_PARSE_RETRIES + 1):
+                with span("llm"):
+                    response = llm.invoke([HumanMessage(content=retry_prompt(prompt) if attempt else prompt)],
+                                          **LLM_CALL_OPTIONS)
+                parsed = handle_nlp_response(response.content, candidates, cache_key)
+                if parsed is not None:
+                    break
+            if parsed is None:
+                metrics.inc("jobyaari_llm_fallbacks_total", reason="parse_failure")
+                return local_search(user_query, snap)
         else:
-            # Fallback if format is wrong
-            answer = "I found some relevant jobs for you:"
-            results = df.head(10)
-        
-        # Apply our improved formatting to the response
-        final_response = create_funny_response(user_query, len(results), results)
-        return final_response
+            print(f"♻️ NLP cache hit: {llm_cache.stats()}")
+
+        return finish_nlp_search(user_query, parsed, snap)
         
     except Exception as e:
         print(f"❌ NLP Error: {e}")
-        # Fallback to enhanced simple search
-        return enhanced_simple_search(user_query)
+        metrics.inc("jobyaari_llm_fallbacks_total", reason="error")
+        # Fallback to local search
+        return local_search(user_query, snap)
+
+
+# -----------------------------
+# ASYNC NLP SEARCH
+# -----------------------------
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+# Chat requests admitted to Gemini: holding an llm_semaphore slot or queued for one
+llm_pending = 0
+
+
+def admit_llm():
+    """Take a place in the Gemini queue, or refuse (back-pressure) when LLM_QUEUE_LIMIT requests already wait
+
+    Counted at admission rather than at the semaphore, so a burst cannot
+    overfill the queue before its first request reaches Gemini.
+    """
+    global llm_pending
+    if llm_pending >= LLM_MAX_CONCURRENCY + LLM_QUEUE_LIMIT:
+        metrics.inc("jobyaari_llm_fallbacks_total", reason="overload")
+        return False
+    llm_pending += 1
+    return True
+
+
+def release_llm(*_):
+    global llm_pending
+    llm_pending -= 1
+
+
+async def ask_llm_async(prompt, candidates, cache_key, first_attempt=0):
+    """Gemini round-trips, each queued behind the global concurrency limit, until one parses
+
+    Returns None when every attempt (1 + LLM_PARSE_RETRIES, counting from
+    first_attempt) came back unreadable.
+    """
+    for attempt in range(first_attempt, LLM_PARSE_RETRIES + 1):
+        async with llm_semaphore:
+            with span("llm"):
+                response = await llm.ainvoke([HumanMessage(content=retry_prompt(prompt) if attempt else prompt)],
+                                             **LLM_CALL_OPTIONS)
+        parsed = handle_nlp_response(response.content, candidates, cache_key)
+        if parsed is not None:
+            return parsed
+    return None
+
+
+def _log_background_failure(task):
+    """Surface errors from hedged Gemini calls nobody is waiting on any more"""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ NLP Error (background): {task.exception()!r}")
+
+
+async def smart_search_with_nlp_async(user_query, top_k=None, shed_load=True):
+    """Non-blocking smart_search_with_nlp with a deadline and optional hedging
+
+    With shed_load, a query arriving while Gemini is overloaded gets local
+    results straight away instead of joining the queue.
+    """
+    snap = snapshot
+    if llm is None:
+        return local_search(user_query, snap)
+
+    try:
+        top_k = RETRIEVAL_TOP_K if top_k is None else top_k
+        cache_key = (normalize_query(user_query), top_k, snap.fingerprint)
+        parsed = llm_cache.get(cache_key)
+        if parsed is not None:
+            print(f"♻️ NLP cache hit: {llm_cache.stats()}")
+            return finish_nlp_search(user_query, parsed, snap)
+
+        candidates = retrieve_candidates(user_query, top_k, snap)
+        prompt, candidates = build_nlp_prompt(user_query, candidates, snap)
+        if shed_load and not admit_llm():
+            return local_search(user_query, snap)
+        task = asyncio.ensure_future(asyncio.wait_for(ask_llm_async(prompt, candidates, cache_key), LLM_TIMEOUT))
+        if shed_load:
+            # Held until Gemini finishes, even when a hedge stops waiting for it
+            task.add_done_callback(release_llm)
+
+        if 0 < LLM_HEDGE_AFTER < LLM_TIMEOUT:
+            try:
+                # shield() keeps the call running so its answer still lands in the cache
+                parsed = await asyncio.wait_for(asyncio.shield(task), LLM_HEDGE_AFTER)
+            except asyncio.TimeoutError:
+                task.add_done_callback(_log_background_failure)
+                print(f"⏱️ Gemini missed the {LLM_HEDGE_AFTER}s hedge budget, serving local results")
+                metrics.inc("jobyaari_llm_fallbacks_total", reason="hedge")
+                return local_search(user_query, snap)
+        else:
+            parsed = await task
+
+        if parsed is None:
+            metrics.inc("jobyaari_llm_fallbacks_total", reason="parse_failure")
+            return local_search(user_query, snap)
+        return finish_nlp_search(user_query, parsed, snap)
+
+    except asyncio.TimeoutError:
+        print(f"⏱️ Gemini missed the {LLM_TIMEOUT}s deadline, falling back to local search")
+        metrics.inc("jobyaari_llm_fallbacks_total", reason="timeout")
+        return local_search(user_query, snap)
+    except Exception as e:
+        print(f"❌ NLP Error: {e}")
+        metrics.inc("jobyaari_llm_fallbacks_total", reason="error")
+        return local_search(user_query, snap)
+
+# -----------------------------
+# STREAMING NLP SEARCH
+# -----------------------------
+ANSWER_FIELD = re.compile(r'"answer"\s*:\s*"')
+# An escape still arriving at the end of a partial JSON string, or half a surrogate pair
+PARTIAL_ESCAPE = re.compile(r'(?:\\u[dD][89abAB][0-9a-fA-F]{2})?(?:\\(?:u[0-9a-fA-F]{0,3})?)?$')
+
+
+def partial_json_answer(response_text, field):
+    """The "answer" string received so far, decoded"""
+    body = response_text[field.end():]
+    end = 0
+    while end < len(body) and body[end] != '"':
+        end += 2 if body[end] == '\\' else 1
+    raw = PARTIAL_ESCAPE.sub("", body[:min(end, len(body))])
+    try:
+        return json.loads(f'"{raw}"').strip()
+    except ValueError:
+        return ""
+
+
+def partial_answer(response_text):
+    """The answer text received so far: the JSON "answer" field, or the ANSWER: section minus INDICES:"""
+    field = ANSWER_FIELD.search(response_text)
+    if field is not None:
+        return partial_json_answer(response_text, field)
+    if "ANSWER:" not in response_text:
+        return ""
+    answer = response_text.split("ANSWER:", 1)[1].split("INDICES:")[0]
+    # Hide a marker that is still arriving, e.g. "...great jobs! IND"
+    for size in range(len("INDICES:") - 1, 0, -1):
+        if answer.endswith("INDICES:"[:size]):
+            answer = answer[:-size]
+            break
+    return answer.strip()
+
+
+async def stream_reply(prompt, chunks):
+    """Stream Gemini's reply into the chunks queue, then None; returns the whole text"""
+    start = time.perf_counter()
+    text = ""
+    try:
+        async with llm_semaphore:
+            async for chunk in llm.astream([HumanMessage(content=prompt)], **LLM_CALL_OPTIONS):
+                text += chunk.content
+                chunks.put_nowait(chunk.content)
+        return text
+    finally:
+        chunks.put_nowait(None)
+        # The stream spans several yields of the reader, so it is timed by hand rather than with span()
+        record_span("llm", time.perf_counter() - start)
+
+
+def _cache_hedged_reply(call, candidates, cache_key):
+    """Parse and cache a streamed reply nobody is waiting on any more"""
+    _log_background_failure(call)
+    if not call.cancelled() and call.exception() is None:
+        handle_nlp_response(call.result(), candidates, cache_key)
+
+
+async def stream_smart_search(user_query, top_k=None, snap=None):
+    """Yield (response, results, done): local results at once, then Gemini's streamed refinement
+
+    results is None on updates that only change the response text. With
+    LLM_HEDGE_AFTER, the local results become the answer when Gemini has not
+    started its answer by then; its reply is still cached for next time.
+    """
+    snap = snap or snapshot
+    local_response, local_results = await local_search_async(user_query, snap)
+    if llm is None:
+        yield local_response, local_results, True
+        return
+
+    top_k = RETRIEVAL_TOP_K if top_k is None else top_k
+    cache_key = (normalize_query(user_query), top_k, snap.fingerprint)
+    parsed = llm_cache.get(cache_key)
+    if parsed is not None:
+        print(f"♻️ NLP cache hit: {llm_cache.stats()}")
+        yield *finish_nlp_search(user_query, parsed, snap), True
+        return
+
+    yield local_response, local_results, False
+
+    candidates = retrieve_candidates(user_query, top_k, snap)
+    prompt, candidates = build_nlp_prompt(user_query, candidates, snap)
+    if not admit_llm():
+        # Gemini is overloaded: the local results already on screen are the answer
+        yield local_response, local_results, True
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LLM_TIMEOUT
+    # With a hedge, stop waiting when no answer text has arrived by then
+    hedge = loop.time() + LLM_HEDGE_AFTER if 0 < LLM_HEDGE_AFTER < LLM_TIMEOUT else None
+    chunks = asyncio.Queue()
+    call = asyncio.ensure_future(asyncio.wait_for(stream_reply(prompt, chunks), LLM_TIMEOUT))
+    # Held until Gemini finishes, even when the hedge stops waiting for it
+    call.add_done_callback(release_llm)
+    response_text = ""
+    shown = ""
+    hedged = False
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.get(), None if shown or hedge is None
+                                               else max(hedge - loop.time(), 0))
+            except asyncio.TimeoutError:
+                hedged = True
+                break
+            if chunk is None:
+                break
+            response_text += chunk
+            answer = partial_answer(response_text)
+            if answer and answer != shown:
+                shown = answer
+                yield answer, None, False
+        if not hedged:
+            response_text = await call
+    except asyncio.TimeoutError:
+        print(f"⏱️ Gemini missed the {LLM_TIMEOUT}s deadline, keeping local results")
+        metrics.inc("jobyaari_llm_fallbacks_total", reason="timeout")
+        yield local_response, local_results, True
+        return
+    except Exception as e:
+        print(f"❌ NLP Error: {e}")
+        metrics.inc("jobyaari_llm_fallbacks_total", reason="error")
+        yield local_response, local_results, True
+        return
+    finally:
+        # A closed stream (the user left) stops the call; a hedged one runs on
+        if not hedged and not call.done():
+            call.cancel()
+
+    if hedged:
+        # The local results on screen are the answer; Gemini's reply still lands in the cache
+        call.add_done_callback(lambda call: _cache_hedged_reply(call, candidates, cache_key))
+        print(f"⏱️ Gemini missed the {LLM_HEDGE_AFTER}s hedge budget, keeping local results")
+        metrics.inc("jobyaari_llm_fallbacks_total", reason="hedge")
+        yield local_response, local_results, True
+        return
+
+    parsed = handle_nlp_response(response_text, candidates, cache_key)
+    if parsed is None and LLM_PARSE_RETRIES:
+        # Unreadable reply: ask again (not streamed) within what is left of the deadline
+        try:
+            parsed = await asyncio.wait_for(ask_llm_async(prompt, candidates, cache_key, first_attempt=1),
+                                            max(deadline - loop.time(), 0))
+        except Exception as e:
+            print(f"❌ NLP retry failed: {e!r}")
+    if parsed is None:
+        # The local results already on screen are the best we have
+        metrics.inc("jobyaari_llm_fallbacks_total", reason="parse_failure")
+        yield local_response, local_results, True
+        return
+
+    yield *finish_nlp_search(user_query, parsed, snap), True
+
+# -----------------------------
+# CHAT SESSIONS
+# -----------------------------
+# Earlier queries quoted in the summary line, and how much of each
+SUMMARY_QUERIES = 5
+SUMMARY_QUERY_CHARS = 40
+# SQLite sessions idle past SESSION_TTL are purged every this many saves
+SESSION_PURGE_EVERY = 500
+
+
+@dataclass
+class ChatSession:
+    """Server-side state of one browser session; Gradio only holds its id"""
+    history: list = field(default_factory=list)  # verbatim turns, oldest first
+    summary: dict = None  # {"turns", "jobs_found", "queries"} of the turns folded away
+    result_ids: np.ndarray = field(default_factory=lambda: np.array([], dtype=np.int64))
+    page: int = 0
+    dataset: str = None  # fingerprint of the snapshot result_ids are row ids of
+
+    def compact(self, keep=MAX_CHAT_TURNS):
+        """Fold all but the last `keep` turns into the summary"""
+        cut = len(self.history) - keep
+        if cut <= 0:
+            return
+        folded = self.history[:cut]
+        del self.history[:cut]
+        summary = self.summary or {"turns": 0, "jobs_found": 0, "queries": []}
+        summary["turns"] += len(folded)
+        summary["jobs_found"] += sum(turn["results_count"] for turn in folded)
+        queries = summary["queries"] + [turn["user"][:SUMMARY_QUERY_CHARS] for turn in folded]
+        summary["queries"] = queries[-SUMMARY_QUERIES:]
+        self.summary = summary
+
+    def results_match(self, snap):
+        """Whether result_ids are row ids of snap's dataset; if not, the results are dropped
+
+        A reload that deletes or inserts a row shifts every later row id, so ids
+        saved against another dataset would page through the wrong jobs.
+        """
+        if not len(self.result_ids) or self.dataset == snap.fingerprint:
+            return True
+        self.result_ids = np.array([], dtype=np.int64)
+        self.page = 0
+        self.dataset = None
+        return False
+
+    def dumps(self):
+        """(UTF-8 JSON state, result id bytes); turn HTML is left out, turn_fragments keeps it"""
+        turns = [{key: value for key, value in turn.items() if key != "html"} for turn in self.history]
+        state = json.dumps({"history": turns, "summary": self.summary, "page": self.page,
+                            "dataset": self.dataset}, ensure_ascii=False)
+        return state.encode('utf-8'), np.asarray(self.result_ids, dtype=np.int64).tobytes()
+
+    @classmethod
+    def loads(cls, state, result_ids):
+        state = json.loads(state)
+        return cls(state["history"], state["summary"], np.frombuffer(result_ids, dtype=np.int64), state["page"],
+                   state.get("dataset"))
+
+
+class MemorySessionStore:
+    """Sessions in process memory: at most SESSION_MAX, each expiring SESSION_TTL seconds after its last turn
+
+    Sessions are kept serialized (UTF-8 JSON + id bytes) rather than as live objects;
+    that is several times smaller than the dicts, lists and cached HTML they unpack to.
+    """
+
+    def __init__(self, maxsize=SESSION_MAX, ttl=SESSION_TTL):
+        self.sessions = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def load(self, session_id):
+        stored = self.sessions.get(session_id)
+        return ChatSession.loads(*stored) if stored else None
+
+    def save(self, session_id, session):
+        self.sessions.put(session_id, session.dumps())
+
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite file: they survive restarts and hold no memory between turns"""
+
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._saves = 0
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS sessions "
+                        "(id TEXT PRIMARY KEY, state BLOB NOT NULL, result_ids BLOB NOT NULL, updated REAL NOT NULL)")
+
+    def load(self, session_id):
+        with self._lock:
+            row = self.db.execute("SELECT state, result_ids, updated FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None or (self.ttl and time.time() - row[2] > self.ttl):
+            return None
+        return ChatSession.loads(row[0], row[1])
+
+    def save(self, session_id, session):
+        state, result_ids = session.dumps()
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                            (session_id, state, result_ids, time.time()))
+            self._saves += 1
+            if self.ttl and self._saves % SESSION_PURGE_EVERY == 0:
+                self.db.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl,))
+            self.db.commit()
+
+
+def create_session_store(kind=SESSION_STORE):
+    if kind == "sqlite":
+        try:
+            return SQLiteSessionStore()
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not open session database {SESSION_DB_PATH}, keeping sessions in memory: {e}")
+    elif kind != "memory":
+        print(f"⚠️ Unknown SESSION_STORE {kind!r}, keeping sessions in memory")
+    return MemorySessionStore()
+
+
+session_store = create_session_store()
 
 # -----------------------------
 # WHATSAPP-STYLE UI
@@ -377,8 +2457,128 @@ custom_css = """
     border-radius: 15px !important;
     margin-top: 20px !important;
 }
+
+.job-cards-list {
+    display: flex !important;
+    flex-direction: column !important;
+    gap: 15px !important;
+}
+
+.job-card {
+    background: linear-gradient(135deg, #1e3a5f, #2d4a7c) !important;
+    border-radius: 15px !important;
+    padding: 20px !important;
+    border: 1px solid #2563eb !important;
+    color: white !important;
+}
+
+.job-card-body {
+    display: flex !important;
+    justify-content: space-between !important;
+    align-items: start !important;
+}
+
+.job-card-info {
+    flex: 1 !important;
+}
+
+.job-card-title {
+    margin: 0 0 8px 0 !important;
+    color: #fbbf24 !important;
+}
+
+.job-card-line {
+    margin: 5px 0 !important;
+    font-size: 14px !important;
+    color: #cbd5e1 !important;
+}
+
+.job-card-deadline {
+    color: #fca5a5 !important;
+}
+
+.apply-btn {
+    background: linear-gradient(45deg, #f97316, #fb923c) !important;
+    border: none !important;
+    border-radius: 10px !important;
+    color: white !important;
+    padding: 10px 20px !important;
+    font-weight: bold !important;
+    cursor: pointer !important;
+    white-space: nowrap !important;
+}
+
+.job-page-info {
+    color: #94a3b8 !important;
+    font-size: 14px !important;
+    margin-bottom: 12px !important;
+}
 """
 
+def bubble_text(text):
+    """Bot text as bubble HTML: escaped, since Gemini's answer can be steered by
+    the query and job text, and with newlines that would otherwise collapse"""
+    return html.escape(text).replace("\n", "<br>")
+
+
+def render_turn(msg):
+    """HTML fragment for one chat turn (user bubble + bot bubble)"""
+    return f"""
+                <div style='display: flex; justify-content: flex-end; margin: 20px 0;'>
+                    <div class='message-user'>
+                        <div style='font-size: 14px;'>{html.escape(msg['user'])}</div>
+                        <div class='message-time'>{msg['time']}</div>
+                    </div>
+                </div>
+                
+                <div style='display: flex; justify-content: flex-start; margin: 20px 0;'>
+                    <div class='message-bot'>
+                        <div style='font-size: 14px;'>{bubble_text(msg['bot'])}</div>
+                        <div class='message-time'>{msg['time']} • {msg['results_count']} jobs found</div>
+                    </div>
+                </div>
+                """
+
+
+def render_summary(summary):
+    """One muted bubble standing in for the turns folded out of the transcript"""
+    queries = ", ".join(f"“{html.escape(query)}”" for query in summary["queries"])
+    return f"""
+                <div style='text-align: center; margin: 10px 0;'>
+                    <div class='message-time'>🗂️ {summary['turns']} earlier messages ({summary['jobs_found']} jobs found) • recent: {queries}</div>
+                </div>
+                """
+
+
+# (session id, turn number, content hash) -> render_turn HTML. Sessions come back
+# from the store without their fragments, so without this every message would
+# re-template the whole transcript. The hash keeps a fragment from being reused
+# for a different turn that got the same number.
+turn_fragments = LRUCache(maxsize=TURN_CACHE_SIZE, ttl=SESSION_TTL)
+
+
+def turn_key(session_id, number, msg):
+    return session_id, number, hash((msg["user"], msg["bot"], msg["time"], msg["results_count"]))
+
+
+def render_chat(history, summary=None, session_id=None):
+    """Chat transcript built from each turn's cached fragment
+
+    With session_id, fragments missing from the turns are looked up in (and
+    added to) turn_fragments, numbering turns from the first one ever sent.
+    """
+    fragments = [render_summary(summary)] if summary else []
+    first_turn = summary["turns"] if summary else 0
+    for number, msg in enumerate(history, first_turn):
+        if "html" not in msg:
+            key = turn_key(session_id, number, msg) if session_id else None
+            msg["html"] = (key and turn_fragments.get(key)) or render_turn(msg)
+            if key:
+                turn_fragments.put(key, msg["html"])
+        fragments.append(msg["html"])
+    return "<div style='padding: 20px; min-height: 400px;'>" + "".join(fragments) + "</div>"
+
+
 def create_chat_ui():
     with gr.Blocks(css=custom_css, theme=gr.themes.Default()) as demo:
         
@@ -392,7 +2592,8 @@ def create_chat_ui():
         </div>
         """)
         
-        chat_state = gr.State([])
+        # Only the session id lives in Gradio state; the session itself is in session_store
+        session_state = gr.State(None)
         
         with gr.Row():
             with gr.Column(scale=1):
@@ -419,6 +2620,19 @@ def create_chat_ui():
                     ],
                     label=""
                 )
+                
+                gr.Markdown("""
+                <div style="background: #1e293b; padding: 20px; border-radius: 15px; border: 1px solid #334155; margin-top: 15px;">
+                    <h3 style="color: #f97316; margin-top: 0;">🏷️ Browse by Facet</h3>
+                    <p style="color: #94a3b8; font-size: 14px;">Live job counts - click to search:</p>
+                </div>
+                """)
+                
+                facet_chips = gr.Dataset(
+                    components=[gr.Textbox(visible=False)],
+                    samples=facet_samples(),
+                    label=""
+                )
             
             with gr.Column(scale=2):
                 chat_display = gr.HTML(
@@ -437,68 +2651,149 @@ def create_chat_ui():
                 
                 with gr.Accordion("📊 Job Results", open=True):
                     results_display = gr.HTML()
+                    with gr.Row():
+                        prev_btn = gr.Button("⬅️ Prev", size="sm")
+                        next_btn = gr.Button("Next ➡️", size="sm")
         
-        def process_message(user_message, history):
+        async def process_message(user_message, session_id):
             if not user_message.strip():
-                return history, "", history, ""
+                yield session_id, "", gr.skip(), gr.skip(), gr.skip()
+                return
             
+            session_id = session_id or uuid.uuid4().hex
+            session = session_store.load(session_id) or ChatSession()
             current_time = datetime.datetime.now().strftime("%H:%M")
             
-            # Get search results
-            bot_response, results_df = smart_search_with_nlp(user_message)
-            
-            # Format job cards
-            job_cards = format_job_cards(results_df)
-            
-            # Add to history
+            # Add to history right away; the entry is updated as results refine
             new_entry = {
                 "user": user_message,
-                "bot": bot_response, 
+                "bot": "", 
                 "time": current_time,
-                "results_count": len(results_df)
+                "results_count": 0
             }
-            history.append(new_entry)
+            session.history.append(new_entry)
+            session.compact()
             
-            # Generate chat HTML
-            chat_html = "<div style='padding: 20px; min-height: 400px;'>"
-            for msg in history:
-                chat_html += f"""
-                <div style='display: flex; justify-content: flex-end; margin: 20px 0;'>
-                    <div class='message-user'>
-                        <div style='font-size: 14px;'>{msg['user']}</div>
-                        <div class='message-time'>{msg['time']}</div>
-                    </div>
-                </div>
-                """
-                chat_html += f"""
-                <div style='display: flex; justify-content: flex-start; margin: 20px 0;'>
-                    <div class='message-bot'>
-                        <div style='font-size: 14px;'>{msg['bot']}</div>
-                        <div class='message-time'>{msg['time']} • {msg['results_count']} jobs found</div>
-                    </div>
-                </div>
-                """
-            chat_html += "</div>"
+            # The whole turn is answered from one dataset version, even if a reload lands mid-way
+            snap = snapshot
+            trace = start_trace(user_message)
+            request_start = time.perf_counter()
+            # Sent every turn so counts follow reloads and expiring jobs; built once per snapshot and day
+            chips = gr.Dataset(samples=facet_samples(snap))
             
-            return history, "", chat_html, job_cards
+            try:
+                # Local results first, then Gemini's streamed answer and its own picks
+                async for bot_response, results_df, _ in stream_smart_search(user_message, snap=snap):
+                    new_entry["bot"] = bot_response
+                    # Streamed text updates leave the cards and chips already on screen alone
+                    job_cards = gr.skip()
+                    if results_df is not None:
+                        new_entry["results_count"] = len(results_df)
+                        job_cards = format_job_cards(results_df, snap=snap)
+                        session.result_ids = results_df.index.to_numpy(dtype=np.int64)
+                        session.page = 0
+                        session.dataset = snap.fingerprint
+                    # Only the live turn is re-templated; older turns reuse their fragment
+                    with span("chat_render"):
+                        new_entry["html"] = render_turn(new_entry)
+                        chat_html = render_chat(session.history, session.summary, session_id)
+                    yield session_id, "", chat_html, job_cards, chips
+                    chips = gr.skip()
+                    if trace:
+                        trace.activate()
+            finally:
+                # Concurrent turns in one session are last-write-wins: the later save replaces the earlier
+                session_store.save(session_id, session)
+                if "html" in new_entry and session.history and session.history[-1] is new_entry:
+                    # The live turn's final fragment, for the transcript of the next message
+                    number = (session.summary["turns"] if session.summary else 0) + len(session.history) - 1
+                    turn_fragments.put(turn_key(session_id, number, new_entry), new_entry["html"])
+                metrics.inc("jobyaari_requests_total")
+                record_span("request", time.perf_counter() - request_start)
+                if trace:
+                    trace.finish(results=new_entry["results_count"], dataset_version=snap.version)
+        
+        def change_page(session_id, step):
+            session = session_store.load(session_id) if session_id else None
+            if session is None:
+                return gr.skip()
+            snap = snapshot
+            if not session.results_match(snap):
+                session_store.save(session_id, session)
+                return "<div style='text-align: center; color: #64748b; padding: 20px;'>The job list was just updated 🔄 Send your search again to see the latest results!</div>"
+            result_ids = session.result_ids
+            page = max(session.page + step, 0)
+            if len(result_ids):
+                page = min(page, (len(result_ids) - 1) // JOB_PAGE_SIZE)
+            session.page = page
+            session_store.save(session_id, session)
+            return format_job_cards(snap.df.loc[result_ids], page, snap=snap)
         
-        def on_suggestion_click(evt: gr.SelectData, history):
-            return evt.value[0], history
+        def on_suggestion_click(evt: gr.SelectData):
+            return evt.value[0]
         
-        send_btn.click(process_message, [chat_input, chat_state], [chat_state, chat_input, chat_display, results_display])
-        chat_input.submit(process_message, [chat_input, chat_state], [chat_state, chat_input, chat_display, results_display])
-        suggestions.select(on_suggestion_click, [chat_state], [chat_input, chat_state])
+        def on_facet_click(evt: gr.SelectData):
+            # Drop the "(count)" suffix, leaving the query
+            return re.sub(r"\s*\(\d+\)$", "", evt.value[0])
+        
+        message_outputs = [session_state, chat_input, chat_display, results_display, facet_chips]
+        send_btn.click(process_message, [chat_input, session_state], message_outputs)
+        chat_input.submit(process_message, [chat_input, session_state], message_outputs)
+        prev_btn.click(lambda session_id: change_page(session_id, -1), [session_state], [results_display])
+        next_btn.click(lambda session_id: change_page(session_id, 1), [session_state], [results_display])
+        suggestions.select(on_suggestion_click, None, [chat_input])
+        facet_chips.select(on_facet_click, None, [chat_input])
     
     return demo
 
-if __name__ == "__main__":
+# -----------------------------
+# METRICS ENDPOINT
+# -----------------------------
+def metrics_text():
+    """Prometheus exposition: request metrics plus cache and dataset gauges"""
+    cache = llm_cache.stats()
+    snap = snapshot
+    gauges = [
+        ("jobyaari_llm_cache_hits_total", "counter", cache["hits"]),
+        ("jobyaari_llm_cache_misses_total", "counter", cache["misses"]),
+        ("jobyaari_llm_cache_entries", "gauge", cache["size"]),
+        ("jobyaari_llm_pending", "gauge", llm_pending),
+        ("jobyaari_dataset_rows", "gauge", len(snap.df)),
+        ("jobyaari_dataset_version", "gauge", snap.version),
+    ]
+    lines = [f"# TYPE {name} {kind}\n{name} {value}" for name, kind, value in gauges]
+    return metrics.render() + "\n".join(lines) + "\n"
+
+
+def mount_metrics(server):
+    """Serve metrics_text() at /metrics on the FastAPI app Gradio runs on"""
+    server.add_api_route("/metrics", lambda: PlainTextResponse(metrics_text(), media_type="text/plain; version=0.0.4"),
+                         methods=["GET"])
+
+
+if __name__ == "__main__" and sys.argv[1:] == ["--write-snapshot"]:
+    persist_dataset()
+    print(f"💾 Wrote {SNAPSHOT_PATH} and {VECTORS_PATH}")
+elif __name__ == "__main__":
     print("🚀 Starting JobYaari Chatbot...")
     print(f"📊 Loaded {len(df)} jobs")
     if llm:
         print("🧠 Gemini AI: Active")
     else:
         print("🔧 Basic Search: Active (Gemini API key not found)")
-    print("🌐 Server: http://127.0.0.1:7860")
+    print(f"🌐 Server: http://127.0.0.1:{SERVER_PORT}")
+    
+    persist_dataset()
+    if WORKERS > 1:
+        start_workers()
+    if DATA_RELOAD_INTERVAL > 0:
+        DatasetWatcher().start()
+        print(f"🔄 Watching {DATA_PATH} for changes every {DATA_RELOAD_INTERVAL:g}s")
     
     demo = create_chat_ui()
-    demo.launch(server_name="127.0.0.1", server_port=7860, share=True)
\ No newline at end of file
+    # Requests past QUEUE_MAX_SIZE are refused with "queue full" rather than piling up
+    demo.queue(default_concurrency_limit=QUEUE_CONCURRENCY, max_size=QUEUE_MAX_SIZE)
+    demo.launch(server_name="127.0.0.1", server_port=SERVER_PORT, share=True, prevent_thread_lock=True)
+    mount_metrics(demo.app)
+    print(f"📈 Metrics: http://127.0.0.1:{SERVER_PORT}/metrics" + (f" • tracing to {TRACE_PATH}" if TRACE_PATH else ""))
+    demo.block_thread()
\ No newline at end of file
@@ -0,0 +1,152 @@
+# batch.py - Run many queries through the JobYaari search without the UI
+#
+# Usage: python batch.py queries.jsonl [-o results.jsonl] [--mode local|llm] [--workers N] [--concurrency N]
+#                       [--include-expired]
+#
+# Each input line is {"query": "...", "id": ...} (id optional, defaults to the
+# line number) or a bare JSON string. Each output line holds the query, the
+# answer text, the matched job ids (row positions) and the time it took.
+# Like the chat, both modes leave out jobs whose last date has passed (as of
+# today) when HIDE_EXPIRED_JOBS is on; --include-expired searches all of them.
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import app
+
+# Job ids written per query; "count" always has the full number of matches
+MAX_JOB_IDS = 100
+
+
+def read_queries(path):
+    """(id, query) pairs from a JSONL file"""
+    items = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                items.append((line_no, item))
+            else:
+                items.append((item.get("id", line_no), item["query"]))
+    return items
+
+
+def result_record(query_id, query, response, results, seconds, max_ids=MAX_JOB_IDS):
+    ids = results.index if max_ids is None else results.index[:max_ids]
+    # Row positions in the dataset, whatever index labels the frame carries
+    positions = app.snapshot.df.index.get_indexer(ids)
+    return {
+        "id": query_id,
+        "query": query,
+        "answer": response,
+        "count": len(results),
+        "job_ids": [int(position) for position in positions],
+        "ms": round(seconds * 1000, 3),
+    }
+
+
+# -----------------------------
+# LOCAL PATH (PROCESS POOL)
+# -----------------------------
+def run_local_query(item, max_ids=MAX_JOB_IDS):
+    """One query through the offline search tiers (semantic + keyword filters)"""
+    query_id, query = item
+    start = time.perf_counter()
+    response, results = app.local_search(query)
+    return result_record(query_id, query, response, results, time.perf_counter() - start, max_ids)
+
+
+def run_local(items, workers=None, max_ids=MAX_JOB_IDS, chunksize=64):
+    """Local search for every item, spread over worker processes; records come back in input order"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [run_local_query(item, max_ids) for item in items]
+    # fork hands every worker the already-built snapshot (copy-on-write);
+    # elsewhere each worker imports app and loads the dataset itself
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method)) as pool:
+        return list(pool.map(partial(run_local_query, max_ids=max_ids), items, chunksize=chunksize))
+
+
+# -----------------------------
+# LLM PATH (BOUNDED CONCURRENCY)
+# -----------------------------
+async def run_llm_query(item, limit, max_ids=MAX_JOB_IDS):
+    """One query through Gemini (with its usual deadline and local fallback)"""
+    query_id, query = item
+    async with limit:
+        start = time.perf_counter()
+        # The batch bounds its own concurrency, so it queues for Gemini rather than being shed
+        response, results = await app.smart_search_with_nlp_async(query, shed_load=False)
+        return result_record(query_id, query, response, results, time.perf_counter() - start, max_ids)
+
+
+async def run_llm(items, concurrency=None, max_ids=MAX_JOB_IDS):
+    """Gemini search for every item with at most `concurrency` queries in flight
+
+    Gemini calls themselves are also capped by app.llm_semaphore (LLM_MAX_CONCURRENCY).
+    """
+    limit = asyncio.Semaphore(concurrency or app.LLM_MAX_CONCURRENCY)
+    return await asyncio.gather(*(run_llm_query(item, limit, max_ids) for item in items))
+
+
+def run_batch(items, mode="local", workers=None, concurrency=None, max_ids=MAX_JOB_IDS):
+    """Run (id, query) pairs through the chosen search path and return one record per query"""
+    if mode == "llm":
+        return asyncio.run(run_llm(items, concurrency, max_ids))
+    return run_local(items, workers, max_ids)
+
+
+def summarize(records, seconds):
+    """Throughput and latency line for a finished batch"""
+    latencies = sorted(record["ms"] for record in records) or [0.0]
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return (f"📦 {len(records)} queries in {seconds:.2f}s ({len(records) / max(seconds, 1e-9):.1f} queries/s) | "
+            f"p50 {p50:.2f} ms | p95 {p95:.2f} ms | max {latencies[-1]:.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSONL file of queries through the JobYaari search")
+    parser.add_argument("queries", help="JSONL file with one query per line")
+    parser.add_argument("-o", "--output", help="results JSONL (default: <queries>.results.jsonl)")
+    parser.add_argument("--mode", choices=["local", "llm"], default="local",
+                        help="local: offline search in a process pool; llm: Gemini with bounded concurrency")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for --mode local (default: all cores)")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="queries in flight for --mode llm (default: LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--max-ids", type=int, default=MAX_JOB_IDS, help="job ids written per query")
+    parser.add_argument("--include-expired", action="store_true",
+                        help="also match jobs whose last date has passed (default: HIDE_EXPIRED_JOBS, on unless set to 0)")
+    args = parser.parse_args(argv)
+    if args.include_expired:
+        # Read per call by the search, and inherited by the forked local workers
+        app.HIDE_EXPIRED_JOBS = False
+
+    items = read_queries(args.queries)
+    output = args.output or os.path.splitext(args.queries)[0] + ".results.jsonl"
+    if args.mode == "llm" and app.llm is None:
+        print("⚠️ Gemini is not configured - every query will use local search")
+
+    start = time.perf_counter()
+    records = run_batch(items, args.mode, args.workers, args.concurrency, args.max_ids)
+    elapsed = time.perf_counter() - start
+
+    with open(output, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(summarize(records, elapsed))
+    print(f"💾 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
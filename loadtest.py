@@ -0,0 +1,152 @@
+# loadtest.py - Concurrent chat traffic against a local JobYaari server with a stub LLM
+#
+# Usage: python loadtest.py [--workers 1,2,4] [--users 32] [--requests 400] [--rows 100000] [--llm-delay 0.5]
+#
+# Each worker count runs in a fresh process: a synthetic dataset of --rows
+# jobs, the Gradio server with its production queue settings and WORKERS
+# local-search processes, and Gemini replaced by a stub that streams its reply
+# over --llm-delay seconds. --users clients then chat with it over HTTP and the
+# script reports throughput, latency, requests shed to local results
+# (Gemini overloaded) or refused (queue full), and how much memory the
+# workers share with the server.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+import benchmark
+
+REPLY = '{"answer": "🎉 Here are some great matches for you!", "jobs": "all"}'
+
+
+def shared_memory_mb(pid):
+    """(RSS, PSS) of a process in MB; PSS splits shared pages between their users"""
+    sizes = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                sizes[parts[0]] = int(parts[1]) / 1024
+    return sizes["Rss:"], sizes["Pss:"]
+
+
+def run_clients(url, users, requests):
+    """users threads sending requests chat messages in total; returns per-request (seconds, ok)"""
+    from gradio_client import Client
+
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    timings = []
+
+    def user():
+        client = Client(url, verbose=False)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            # Distinct text so every message misses the Gemini cache
+            query = f"{benchmark.QUERIES[i % len(benchmark.QUERIES)]} #{i}"
+            start = time.perf_counter()
+            try:
+                client.predict(query, api_name="/process_message")
+                ok = True
+            except Exception:
+                ok = False
+            with lock:
+                timings.append((time.perf_counter() - start, ok))
+
+    with ThreadPoolExecutor(users) as pool:
+        for _ in range(users):
+            pool.submit(user)
+    return timings
+
+
+def serve(workers, rows, llm_delay, port):
+    """Runs in a fresh interpreter: serve until stdin closes, then report server-side stats
+
+    The clients live in the parent process so they do not compete with the server for the GIL.
+    """
+    benchmark.use_dataset(benchmark.synthetic_jobs(rows))
+    app.llm = benchmark.FakeLLM(llm_delay, REPLY)
+    app.WORKERS = workers
+    if workers > 1:
+        app.start_workers()
+
+    demo = app.create_chat_ui()
+    demo.queue(default_concurrency_limit=app.QUEUE_CONCURRENCY, max_size=app.QUEUE_MAX_SIZE)
+    demo.launch(server_name="127.0.0.1", server_port=port, prevent_thread_lock=True, quiet=True)
+    print("ready", flush=True)
+    cpu_start = time.process_time()
+    sys.stdin.read()
+    cpu = time.process_time() - cpu_start
+    demo.close()
+
+    memory = [shared_memory_mb(pid) for pid in app.worker_pool[1]._processes] if app.worker_pool else []
+    print(json.dumps({
+        "server_cpu_s": cpu,
+        "shed": app.metrics.counters.get(("jobyaari_llm_fallbacks_total", (("reason", "overload"),)), 0),
+        "worker_rss_mb": sum(rss for rss, _ in memory) / max(len(memory), 1),
+        "worker_pss_mb": sum(pss for _, pss in memory) / max(len(memory), 1),
+    }), flush=True)
+
+
+def load(workers, users, requests, rows, llm_delay, port):
+    """Start a server with `workers` search processes, chat with it, return the combined stats"""
+    server = subprocess.Popen([sys.executable, __file__, "--serve", str(workers), str(rows), str(llm_delay), str(port)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        while server.stdout.readline().strip() != "ready":
+            if server.poll() is not None:
+                raise RuntimeError(f"server for WORKERS={workers} exited early")
+        start = time.perf_counter()
+        timings = run_clients(f"http://127.0.0.1:{port}/", users, requests)
+        elapsed = time.perf_counter() - start
+        stdout, _ = server.communicate("", timeout=120)
+    finally:
+        if server.poll() is None:
+            server.kill()
+
+    latencies = sorted(seconds * 1000 for seconds, ok in timings if ok) or [0.0]
+    stats = json.loads(stdout.strip().splitlines()[-1])
+    stats.update({
+        "throughput": sum(ok for _, ok in timings) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "refused": sum(not ok for _, ok in timings),
+        "server_cpu_ms": stats["server_cpu_s"] * 1000 / max(len(timings), 1),
+    })
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the JobYaari chat server with a stub LLM")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated WORKERS values to compare")
+    parser.add_argument("--users", type=int, default=32, help="concurrent chat clients")
+    parser.add_argument("--requests", type=int, default=400, help="chat messages per run")
+    parser.add_argument("--rows", type=int, default=100_000, help="synthetic dataset size")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="seconds the stub LLM takes per reply")
+    parser.add_argument("--port", type=int, default=7870)
+    args = parser.parse_args(argv)
+
+    print(f"🏋️ {args.requests} chat messages from {args.users} users | {args.rows} jobs | stub LLM {args.llm_delay:g}s | "
+          f"queue concurrency {app.QUEUE_CONCURRENCY}, max size {app.QUEUE_MAX_SIZE} | "
+          f"Gemini slots {app.LLM_MAX_CONCURRENCY} + {app.LLM_QUEUE_LIMIT} queued | {os.cpu_count()} CPUs")
+    for workers in [int(n) for n in args.workers.split(",")]:
+        r = load(workers, args.users, args.requests, args.rows, args.llm_delay, args.port)
+        memory = f" | worker RSS {r['worker_rss_mb']:6.1f} MB, PSS {r['worker_pss_mb']:6.1f} MB" if workers > 1 else ""
+        print(f"  WORKERS={workers:<2} | {r['throughput']:6.1f} msg/s | p50 {r['p50_ms']:7.1f} ms | p95 {r['p95_ms']:7.1f} ms | "
+              f"server CPU {r['server_cpu_ms']:6.1f} ms/msg | shed {r['shed']:>4} | refused {r['refused']:>4}{memory}")
+
+
+if __name__ == "__main__" and sys.argv[1:2] == ["--serve"]:
+    workers, rows, llm_delay, port = sys.argv[2:6]
+    serve(int(workers), int(rows), float(llm_delay), int(port))
+elif __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# app reads its dataset relative to the working directory
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+import app  # noqa: E402
+from benchmark import FakeLLM  # noqa: E402
+
+REPLY = '{"answer": "Here are some jobs 🎉", "jobs": "all"}'
+
+
+@pytest.fixture
+def show_expired(monkeypatch):
+    """Search every bundled job, so results do not depend on today's date"""
+    monkeypatch.setattr(app, "HIDE_EXPIRED_JOBS", False)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Replace Gemini with FakeLLM; call the fixture with (delay, reply) to install one"""
+    monkeypatch.setattr(app, "llm_semaphore", asyncio.Semaphore(app.LLM_MAX_CONCURRENCY))
+    monkeypatch.setattr(app, "llm_pending", 0)
+    app.llm_cache.clear()
+
+    def install(delay=0.0, reply=REPLY):
+        llm = FakeLLM(delay, reply)
+        monkeypatch.setattr(app, "llm", llm)
+        return llm
+
+    yield install
+    app.llm_cache.clear()
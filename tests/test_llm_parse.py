@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import app
+
+with open("llm_responses.json", 'r', encoding='utf-8') as f:
+    CORPUS = json.load(f)
+CANDIDATES = CORPUS["candidates"]
+
+
+@pytest.mark.parametrize("item", CORPUS["responses"], ids=range(len(CORPUS["responses"])))
+def test_recorded_reply(item):
+    """Readable replies give exactly their jobs; truncated or refused ones give None"""
+    parsed = app.parse_nlp_response(item["response"], CANDIDATES)
+    if item["jobs"] is None:
+        assert parsed is None
+    else:
+        assert parsed is not None and parsed[1] == item["jobs"]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("3, 11", [3, 11]),
+    ("8-17", [8, 11, 17]),
+    ("all", CANDIDATES),
+    ([21, "3 to 8"], [21, 3, 8]),
+    ("999, 4, 3", [3]),
+])
+def test_parse_indices(value, expected):
+    assert app.parse_indices(value, CANDIDATES) == expected
+
+
+def test_partial_answer_while_streaming():
+    reply = '{"answer": "Caf\\u00e9 jobs \\"near\\" you", "jobs": [3]}'
+    seen = [app.partial_answer(reply[:end]) for end in range(len(reply) + 1)]
+    assert seen[-1] == 'Café jobs "near" you'
+    # Every prefix decodes to a prefix of the final answer, never to a half escape
+    assert all(seen[-1].startswith(text) for text in seen)
+
+
+def test_prompt_budget_keeps_best_candidates():
+    candidates = app.retrieve_candidates("engineering jobs")
+    prompt, kept = app.build_nlp_prompt("engineering jobs", candidates, app.snapshot, budget=300)
+    assert 0 < len(kept) < len(candidates)
+    assert kept == candidates[:len(kept)]
+    assert app.estimate_tokens(prompt) <= 300
+
+
+def test_answer_is_plain_text_escaped_in_the_chat():
+    answer, _ = app.finish_nlp_search("q", ("<img src=x onerror=alert(1)> R&D jobs", [0]), app.snapshot)
+    assert answer == "<img src=x onerror=alert(1)> R&D jobs"
+    turn = app.render_turn({"user": "<b>hi</b>", "bot": answer, "time": "10:00", "results_count": 1})
+    assert "<img" not in turn and "<b>" not in turn
+    assert "R&amp;D jobs" in turn
@@ -0,0 +1,62 @@
+import json
+import random
+
+import pytest
+
+import app
+from benchmark import misspell
+
+with open("golden_queries.json", 'r', encoding='utf-8') as f:
+    GOLDEN = json.load(f)
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return app.QueryParser(app.load_data())
+
+
+@pytest.mark.parametrize("case", GOLDEN, ids=[case["query"] for case in GOLDEN])
+def test_golden_query(parser, case):
+    assert parser.parse(case["query"]).to_dict() == case["spec"]
+
+
+def test_fuzzy_resolves_most_misspellings(parser):
+    rng = random.Random(7)
+    targets = sorted((phrase, kind, value) for phrase, entries in parser.vocabulary.items()
+                     for kind, value in entries if kind in ("location", "degree") and phrase[0].isalpha())
+    resolved = 0
+    for _ in range(300):
+        phrase, kind, value = rng.choice(targets)
+        spec = parser.parse(f"jobs in {misspell(phrase, rng)}")
+        resolved += value in (spec.locations if kind == "location" else spec.degrees)
+    assert resolved / 300 >= 0.8
+
+
+def test_dataset_degree_terms_match_whole_words(parser):
+    (pattern,) = parser.parse("CA jobs").degrees
+    qualifications = app.load_data()['Qualification'].astype(str)
+    matched = qualifications[qualifications.str.contains(pattern, case=False)]
+    assert len(matched)
+    assert not matched.str.contains("Education").any()
+    assert app.pattern_label(pattern) == "ca"
+
+
+def test_degree_aliases_match_whole_words(parser):
+    (pattern,) = parser.parse("Jobs requiring B.Tech qualification").degrees
+    qualifications = app.load_data()['Qualification'].astype(str)
+    matched = qualifications[qualifications.str.contains(pattern, case=False)]
+    assert len(matched)
+    assert not matched.str.contains(r"B\.Ed|B\.El\.Ed|Education").any()
+    assert app.pattern_label(pattern) == "B.Tech"
+
+
+@pytest.mark.parametrize("query, experience", [
+    ("jobs for 25 year old", None),
+    ("jobs for 30 years of age", None),
+    ("2 years jobs in pune", None),
+    ("2 years exp jobs", (2, 2)),
+    ("3+ years", (3, None)),
+    ("up to 2 years", (0, 2)),
+])
+def test_years_need_experience_context(parser, query, experience):
+    assert parser.parse(query).experience == experience
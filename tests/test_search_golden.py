@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import pytest
+
+import app
+
+
+def ask(query, **kwargs):
+    return asyncio.run(app.smart_search_with_nlp_async(query, **kwargs))
+
+
+def stream(query):
+    async def collect():
+        return [update async for update in app.stream_smart_search(query)]
+    return asyncio.run(collect())
+
+
+def reply(jobs, answer="Here you go 🎉"):
+    return json.dumps({"answer": answer, "jobs": jobs})
+
+
+def test_llm_picks_map_back_to_rows(fake_llm):
+    candidates = app.retrieve_candidates("engineering jobs")
+    fake_llm(reply=reply(candidates[1:3]))
+    response, results = ask("engineering jobs")
+    assert response == "Here you go 🎉"
+    assert list(results.index) == candidates[1:3]
+
+
+def test_replies_are_cached(fake_llm):
+    llm = fake_llm()
+    ask("science jobs")
+    ask("Science  jobs")
+    assert llm.calls == 1
+
+
+def test_deadline_falls_back_to_local(fake_llm, monkeypatch):
+    fake_llm(delay=1.0)
+    monkeypatch.setattr(app, "LLM_TIMEOUT", 0.05)
+    response, results = ask("commerce jobs")
+    assert (response, list(results.index)) == _local("commerce jobs")
+
+
+def test_unreadable_reply_is_retried_then_local(fake_llm):
+    llm = fake_llm(reply="Sorry, I can't help with that.")
+    response, results = ask("education jobs")
+    assert llm.calls == 1 + app.LLM_PARSE_RETRIES
+    assert (response, list(results.index)) == _local("education jobs")
+
+
+def test_overload_sheds_to_local(fake_llm, monkeypatch):
+    llm = fake_llm()
+    monkeypatch.setattr(app, "llm_pending", app.LLM_MAX_CONCURRENCY + app.LLM_QUEUE_LIMIT)
+    response, results = ask("science jobs")
+    assert (response, list(results.index)) == _local("science jobs")
+    assert llm.calls == 0
+    ask("science jobs", shed_load=False)
+    assert llm.calls == 1
+
+
+@pytest.mark.parametrize("path", ["async", "stream"])
+def test_hedge_serves_local_and_caches_gemini(fake_llm, monkeypatch, path):
+    llm = fake_llm(delay=0.3)
+    monkeypatch.setattr(app, "LLM_HEDGE_AFTER", 0.05)
+
+    async def hedged_then_cached():
+        if path == "async":
+            first = await app.smart_search_with_nlp_async("engineering jobs")
+        else:
+            first = [update async for update in app.stream_smart_search("engineering jobs")][-1][:2]
+        # Gemini finishes in the background and lands in the cache
+        await asyncio.sleep(0.5)
+        second = await app.smart_search_with_nlp_async("engineering jobs")
+        return first, second
+
+    (response, results), (cached, _) = asyncio.run(hedged_then_cached())
+    assert (response, list(results.index)) == _local("engineering jobs")
+    assert cached == "Here are some jobs 🎉"
+    assert llm.calls == 1
+    assert app.llm_pending == 0
+
+
+def test_stream_shows_local_then_text_then_llm_cards(fake_llm):
+    candidates = app.retrieve_candidates("jobs in delhi")
+    fake_llm(delay=0.05, reply=reply(candidates[:2], "Delhi has 2 great openings for you!"))
+    updates = stream("jobs in delhi")
+
+    response, results, done = updates[0]
+    assert (response, list(results.index), done) == (*_local("jobs in delhi"), False)
+    texts = [response for response, results, done in updates[1:-1]]
+    assert texts and all(results is None for _, results, _ in updates[1:-1])
+    assert all("Delhi has 2 great openings for you!".startswith(text) for text in texts)
+    response, results, done = updates[-1]
+    assert (response, list(results.index), done) == ("Delhi has 2 great openings for you!", candidates[:2], True)
+
+
+@pytest.mark.parametrize("hide_expired", [True, False])
+@pytest.mark.parametrize("query", [
+    "how many jobs in total",
+    "how many science jobs in delhi for freshers",
+    "how many engineering jobs requiring b.tech",
+    "how many jobs with 2 years experience",
+    "how many CA jobs",
+])
+def test_facet_counts_match_search(query, hide_expired):
+    snap = app.snapshot
+    spec = snap.parser.parse(query)
+    positions = snap.search_index.lookup(spec, hide_expired=hide_expired)
+    expected = len(snap.df) if positions is None else len(positions)
+    assert snap.facets.count(spec, hide_expired=hide_expired) == expected
+
+
+def test_ca_search_returns_only_ca_jobs(show_expired):
+    response, results = app.local_search("how many CA jobs")
+    assert response.startswith("📊 There are exactly 2 jobs requiring ca")
+    assert set(results['Qualification']) == {'CA/ICWA/CMA', 'B.Com/M.Com/CA'}
+
+
+def test_count_answer_is_plain_text(show_expired):
+    response, _ = app.local_search("how many CA jobs")
+    assert response.endswith("\n\nCommerce: 2")
+    turn = app.render_turn({"user": "how many CA jobs", "bot": response, "time": "10:00", "results_count": 2})
+    assert "<br><br>Commerce: 2" in turn
+
+
+def _local(query):
+    response, results = app.local_search(query)
+    return response, list(results.index)
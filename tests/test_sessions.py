@@ -0,0 +1,22 @@
+import numpy as np
+
+import app
+
+
+def test_results_are_dropped_after_rows_shift():
+    snap = app.snapshot
+    session = app.ChatSession(result_ids=np.array([3, 7], dtype=np.int64), page=1, dataset=snap.fingerprint)
+    store = app.MemorySessionStore()
+    store.save("s", session)
+    session = store.load("s")
+    assert session.results_match(snap)
+    assert list(session.result_ids) == [3, 7]
+
+    # Deleting the first job shifts every later row id
+    reloaded = app.JobSnapshot(snap.df.iloc[1:].reset_index(drop=True), version=snap.version + 1)
+    assert not session.results_match(reloaded)
+    assert (len(session.result_ids), session.page) == (0, 0)
+
+
+def test_session_without_results_pages_nothing():
+    assert app.ChatSession().results_match(app.snapshot)